@@ -0,0 +1,316 @@
+# Final Project - Chess - CIS 163
+# Prof. Ira Woodring
+# Created by Clay Beal
+# - in association with Zachary Bauer
+"""
+Measures how long the computer takes to move over a fixed corpus of
+middlegame and endgame positions, and compares runs to catch regressions.
+
+Each position is played once per repeat on a fresh game. Wall time and
+nodes are recorded for every move, and a separate run counts the calls to
+Game.copy_board, Game.check and Game.mate. The report gives p50, p95 and
+p99 latencies overall and per phase.
+
+Usage:
+    python benchmark.py run [--output FILE] [--repeat N]
+                            [--time-ms MS] [--mover MODULE:FUNCTION]
+    python benchmark.py run [--output FILE] [--repeat N] --depth N
+    python benchmark.py compare BASELINE CURRENT [--threshold FRACTION]
+"""
+import argparse
+import importlib
+import json
+import math
+import platform
+import sys
+import time
+from typing import Callable
+
+from game import Game
+from engine import Engine
+
+# Positions in FEN
+CORPUS = {
+    'middlegame': {
+        'ruy lopez': 'r2qk2r/1pp1bppp/p1np1n2/4p1B1/B3P1b1/2NP1N2/PPP2PPP/'
+                     'R2QK2R w - - 0 8',
+        'queens gambit': 'r1bqk2r/p2nbppp/2p1pn2/1p4B1/2BP4/2N1PN2/PP3PPP/'
+                         'R2QK2R w - - 0 9',
+        'najdorf': 'rn1qk2r/1p2bppp/p2pbn2/4p3/4P3/1NN1B3/PPP1BPPP/R2QK2R '
+                   'w - - 0 9',
+        'kings indian': 'r1bqk2r/1ppn1pb1/3p1npp/p2Pp1B1/2P1P3/2N2N2/'
+                        'PP2BPPP/R2QK2R w - - 0 9',
+        'giuoco piano': 'r2qk2r/bpp2ppp/p1npbn2/4p3/4P3/1BPP1N1P/PP1N1PP1/'
+                        'R1BQK2R w - - 0 9',
+        'french': 'rnb1k1r1/ppq1np1Q/4p3/3pP3/3p4/P1P5/2P2PPP/R1B1KBNR '
+                  'w - - 0 10',
+    },
+    'endgame': {
+        'rook and pawns': '8/1p1k4/1P4R1/7p/4P2P/6P1/2K5/8 b - - 0 29',
+        'minor pieces': '2B5/6b1/1k6/2n3R1/P3P3/1P6/8/4K3 b - - 0 31',
+        'rook against bishop': '7B/4kp2/7n/8/7P/r2P4/2P1K3/8 w - - 0 26',
+        'knights and bishop': '1n6/2p5/4k3/5p2/b7/6K1/7P/6NR w - - 0 27',
+        'bishops': '5b2/8/6k1/7p/2P1N3/7B/1P2P3/6K1 b - - 0 30',
+    },
+}
+# Methods whose calls are counted
+COUNTED = ('copy_board', 'check', 'mate')
+DEFAULT_REPEAT = 3
+DEFAULT_THRESHOLD = 0.10
+
+
+def percentile(values: list, fraction: float) -> float:
+    """
+    Gets a percentile by the nearest-rank method
+    Parameters:
+        values (list): measurements
+        fraction (float): percentile as a fraction, like 0.95
+    Returns:
+        (float): the smallest value at least that fraction of values are at
+                 or below
+    """
+    ordered = sorted(values)
+    rank = max(1, math.ceil(len(ordered) * fraction))
+    return ordered[rank - 1]
+
+
+def latency_summary(times: list) -> dict:
+    """
+    Summarizes move latencies
+    Parameters:
+        times (list): wall times in milliseconds
+    Returns:
+        (dict): p50, p95, p99, mean and max in milliseconds
+    """
+    return {'p50_ms': percentile(times, 0.50),
+            'p95_ms': percentile(times, 0.95),
+            'p99_ms': percentile(times, 0.99),
+            'mean_ms': sum(times) / len(times),
+            'max_ms': max(times)}
+
+
+def load_mover(name: str) -> Callable:
+    """
+    Gets the function that makes the computer's move
+    Parameters:
+        name (str): 'computer' for Game._computer_move, or MODULE:FUNCTION
+                    for a function taking the game
+    Returns:
+        (callable): function taking a Game and making one move on it
+    """
+    if name == 'computer':
+        return Game._computer_move
+    module, _, function = name.partition(':')
+    return getattr(importlib.import_module(module), function)
+
+
+class _Probe:
+    """
+    Wraps methods for the length of a run: Engine.search to read the nodes
+    of every search, and optionally the COUNTED Game methods to count their
+    calls. The wrappers slow those methods down, so calls are counted in a
+    run of their own
+    """
+    def __init__(self, count_calls: bool) -> None:
+        """
+        Creates a probe
+        Parameters:
+            count_calls (bool): True to count calls to the COUNTED methods
+        """
+        self.nodes = 0
+        self.calls = dict.fromkeys(COUNTED, 0)
+        self._count_calls = count_calls
+        self._saved = []
+
+    def __enter__(self) -> '_Probe':
+        """
+        Puts the wrappers in place
+        """
+        search = Engine.search
+        probe = self
+
+        def counted_search(engine, *args, **kwargs):
+            result = search(engine, *args, **kwargs)
+            probe.nodes += engine.nodes + engine.qnodes
+            return result
+        self._patch(Engine, 'search', counted_search)
+
+        if self._count_calls:
+            for name in COUNTED:
+                self._patch(Game, name, self._counter(name,
+                                                      getattr(Game, name)))
+        return self
+
+    def __exit__(self, *exc) -> None:
+        """
+        Puts the original methods back
+        """
+        for owner, name, method in reversed(self._saved):
+            setattr(owner, name, method)
+        self._saved = []
+
+    def _patch(self, owner, name: str, method) -> None:
+        """
+        Replaces a method, remembering the original
+        """
+        self._saved.append((owner, name, getattr(owner, name)))
+        setattr(owner, name, method)
+
+    def _counter(self, name: str, method) -> Callable:
+        """
+        Wraps a method to count its calls under a name
+        """
+        calls = self.calls
+
+        def counted(*args, **kwargs):
+            calls[name] += 1
+            return method(*args, **kwargs)
+        return counted
+
+
+def run(mover: Callable, repeat: int) -> dict:
+    """
+    Plays the computer's move in every corpus position
+    Parameters:
+        mover (callable): function taking a Game and making one move on it
+        repeat (int): timed moves per position
+    Returns:
+        (dict): per position results and latency summaries
+    """
+    positions = []
+    for phase, lines in CORPUS.items():
+        for name, fen in lines.items():
+            times = []
+            nodes = []
+            for _ in range(repeat):
+                game = Game.from_fen(fen)
+                with _Probe(False) as probe:
+                    start = time.perf_counter()
+                    mover(game)
+                    times.append((time.perf_counter() - start) * 1000)
+                nodes.append(probe.nodes)
+            game = Game.from_fen(fen)
+            with _Probe(True) as probe:
+                mover(game)
+            positions.append({'name': name, 'phase': phase,
+                              'wall_ms': times, 'nodes': nodes,
+                              'calls': probe.calls})
+
+    all_times = [t for position in positions for t in position['wall_ms']]
+    total_nodes = sum(sum(position['nodes']) for position in positions)
+    summary = latency_summary(all_times)
+    summary['nodes'] = total_nodes
+    summary['nodes_per_second'] = total_nodes / (sum(all_times) / 1000)
+    return {'summary': summary,
+            'phases': {phase: latency_summary(
+                [t for position in positions if position['phase'] == phase
+                 for t in position['wall_ms']]) for phase in CORPUS},
+            'positions': positions}
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> list:
+    """
+    Finds measurements that got worse by more than a threshold
+    Parameters:
+        baseline (dict): stored report
+        current (dict): new report
+        threshold (float): allowed slowdown as a fraction, like 0.10
+    Returns:
+        (list): descriptions of the regressions, empty if there are none
+    """
+    regressions = []
+    sections = [('overall', baseline['summary'], current['summary'])]
+    for phase in current['phases']:
+        if phase in baseline['phases']:
+            sections.append((phase, baseline['phases'][phase],
+                             current['phases'][phase]))
+    for label, old, new in sections:
+        for key in ('p50_ms', 'p95_ms', 'p99_ms'):
+            if new[key] > old[key] * (1 + threshold):
+                regressions.append(f'{label} {key}: {old[key]:.1f} -> '
+                                   f'{new[key]:.1f} '
+                                   f'(+{new[key] / old[key] - 1:.0%})')
+    old = baseline['summary']['nodes_per_second']
+    new = current['summary']['nodes_per_second']
+    if new < old * (1 - threshold):
+        regressions.append(f'nodes per second: {old:,.0f} -> {new:,.0f} '
+                           f'({new / old - 1:.0%})')
+    return regressions
+
+
+def main() -> None:
+    """
+    Command line entry point; compare exits with status 1 on a regression
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+    run_parser = commands.add_parser('run', help='benchmark the computer move')
+    run_parser.add_argument('--output', default='benchmark.json')
+    run_parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT)
+    run_parser.add_argument('--time-ms', type=int, default=None,
+                            help='think time for the computer move, '
+                                 'Game.COMPUTER_MOVE_MS if not given')
+    run_parser.add_argument('--depth', type=int, default=None,
+                            help='make the computer move by searching to a '
+                                 'fixed depth instead of for a fixed time')
+    run_parser.add_argument('--mover', default='computer',
+                            help="'computer' or MODULE:FUNCTION taking a "
+                                 "Game; not with --depth")
+    compare_parser = commands.add_parser('compare',
+                                         help='check a run against a baseline')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float,
+                                default=DEFAULT_THRESHOLD,
+                                help='allowed slowdown as a fraction')
+    args = parser.parse_args()
+
+    if args.command == 'compare':
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        with open(args.current) as file:
+            current = json.load(file)
+        regressions = compare(baseline, current, args.threshold)
+        for regression in regressions:
+            print('REGRESSION', regression)
+        if regressions:
+            sys.exit(1)
+        print('no regressions')
+        return
+
+    if args.depth is not None and (args.mover != 'computer' or
+                                   args.time_ms is not None):
+        run_parser.error('--depth replaces the computer move, so it cannot '
+                         'be given with --mover or --time-ms')
+    if args.time_ms is not None:
+        Game.COMPUTER_MOVE_MS = args.time_ms
+    mover_name = args.mover
+    time_ms = Game.COMPUTER_MOVE_MS
+    if args.depth is not None:
+        depth = args.depth
+        mover_name = f'best_move(depth={depth})'
+        time_ms = None
+
+        def mover(game: Game) -> None:
+            move = game.best_move(depth)
+            if move is not None:
+                game.move(game.get(move[0], move[1]), *move)
+    else:
+        mover = load_mover(args.mover)
+
+    report = run(mover, args.repeat)
+    report['settings'] = {'mover': mover_name, 'repeat': args.repeat,
+                          'time_ms': time_ms,
+                          'depth': args.depth,
+                          'python': platform.python_version(),
+                          'machine': platform.machine()}
+    with open(args.output, 'w') as file:
+        json.dump(report, file, indent=2)
+    summary = report['summary']
+    print(f'p50 {summary["p50_ms"]:.1f} ms  p95 {summary["p95_ms"]:.1f} ms  '
+          f'p99 {summary["p99_ms"]:.1f} ms  '
+          f'{summary["nodes_per_second"]:,.0f} nodes/s  -> {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,349 @@
+# Final Project - Chess - CIS 163
+# Prof. Ira Woodring
+# Created by Clay Beal
+# - in association with Zachary Bauer
+from typing import Iterator, Optional
+
+from piece_model import Color, Piece, King, Queen, Rook, Bishop, Knight, Pawn
+from piece_model import NORTH, SOUTH, EAST, WEST, NORTH_EAST, NORTH_WEST, \
+    SOUTH_EAST, SOUTH_WEST, DIRECTIONS, KNIGHT_TARGETS, KING_TARGETS, \
+    PAWN_PUSHES, PAWN_CAPTURES, RAY_TARGETS
+
+# Every square (y, x) on the board is bit y * 8 + x of a 64-bit int, so a
+# set of squares is a single int and set operations are int operations
+
+# Piece types in the order they are indexed in Bitboards.pieces
+KINDS = (Pawn, Knight, Bishop, Rook, Queen, King)
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(6)
+KIND_INDEX = {kind: i for i, kind in enumerate(KINDS)}
+# Piece values in centipawns, indexed like KINDS
+PIECE_VALUES = (100, 320, 330, 500, 900, 0)
+
+# (y, x) coordinate of every square index and the single bit for it
+SQUARES = [(sq // 8, sq % 8) for sq in range(64)]
+BITS = [1 << sq for sq in range(64)]
+FULL = (1 << 64) - 1
+
+ORTHOGONAL = (NORTH, SOUTH, EAST, WEST)
+DIAGONAL = (NORTH_EAST, NORTH_WEST, SOUTH_EAST, SOUTH_WEST)
+# True if walking in the direction increases the square index
+POSITIVE = tuple(y_d * 8 + x_d > 0 for y_d, x_d in DIRECTIONS)
+
+
+def to_bitboard(squares) -> int:
+    """
+    Builds a bitboard from (y, x) coordinates
+    Parameters:
+        squares (iterable): (y, x) coordinates
+    Returns:
+        (int): bitboard with those squares set
+    """
+    bb = 0
+    for y, x in squares:
+        bb |= BITS[y * 8 + x]
+    return bb
+
+
+# Attack masks built from the move tables in piece_model
+KNIGHT_ATTACKS = [to_bitboard(KNIGHT_TARGETS[y][x]) for y, x in SQUARES]
+KING_ATTACKS = [to_bitboard(KING_TARGETS[y][x]) for y, x in SQUARES]
+# Indexed by color value; white pawns capture towards y = 0
+PAWN_ATTACKS = [[to_bitboard(PAWN_CAPTURES[color][y][x]) for y, x in SQUARES]
+                for color in range(2)]
+# RAYS[direction][square]
+RAYS = [[to_bitboard(RAY_TARGETS[direction][y][x]) for y, x in SQUARES]
+        for direction in range(8)]
+# Square indexes a pawn pushes to, one space then two spaces
+PAWN_PUSH_SQUARES = [[[y2 * 8 + x2 for y2, x2 in PAWN_PUSHES[color][y][x]]
+                      for y, x in SQUARES] for color in range(2)]
+
+
+def _between(sq: int, sq2: int) -> int:
+    """
+    Builds the set of squares strictly between two squares on the same
+    rank, file or diagonal; empty if they do not share a line
+    """
+    for direction in range(8):
+        if RAYS[direction][sq] & BITS[sq2]:
+            return RAYS[direction][sq] & ~RAYS[direction][sq2] & ~BITS[sq2]
+    return 0
+
+
+# Last rank for the pawns of each color, indexed by color value
+PROMOTION_SQUARES = [0xFF, 0xFF << 56]
+
+# BETWEEN[square][square]
+BETWEEN = [[_between(sq, sq2) for sq2 in range(64)] for sq in range(64)]
+
+
+def lsb(bb: int) -> int:
+    """
+    Gets the index of the lowest set square of a bitboard
+    Parameters:
+        bb (int): non-empty bitboard
+    Returns:
+        (int): square index
+    """
+    return (bb & -bb).bit_length() - 1
+
+
+def iter_squares(bb: int) -> Iterator[int]:
+    """
+    Yields the index of every set square of a bitboard, lowest first
+    Parameters:
+        bb (int): bitboard
+    """
+    while bb:
+        low = bb & -bb
+        yield low.bit_length() - 1
+        bb ^= low
+
+
+def ray_attacks(sq: int, direction: int, occupied: int) -> int:
+    """
+    Gets the squares a slider on sq attacks in one direction. The ray stops
+    at (and includes) the first occupied square
+    Parameters:
+        sq (int): square index of the slider
+        direction (int): index into DIRECTIONS
+        occupied (int): bitboard of every occupied square
+    Returns:
+        (int): bitboard of attacked squares
+    """
+    ray = RAYS[direction][sq]
+    blockers = ray & occupied
+    if blockers:
+        if POSITIVE[direction]:
+            blocker = (blockers & -blockers).bit_length() - 1
+        else:
+            blocker = blockers.bit_length() - 1
+        ray ^= RAYS[direction][blocker]
+    return ray
+
+
+def bishop_attacks(sq: int, occupied: int) -> int:
+    """
+    Gets the squares a bishop on sq attacks
+    """
+    return (ray_attacks(sq, NORTH_EAST, occupied)
+            | ray_attacks(sq, NORTH_WEST, occupied)
+            | ray_attacks(sq, SOUTH_EAST, occupied)
+            | ray_attacks(sq, SOUTH_WEST, occupied))
+
+
+def rook_attacks(sq: int, occupied: int) -> int:
+    """
+    Gets the squares a rook on sq attacks
+    """
+    return (ray_attacks(sq, NORTH, occupied)
+            | ray_attacks(sq, SOUTH, occupied)
+            | ray_attacks(sq, EAST, occupied)
+            | ray_attacks(sq, WEST, occupied))
+
+
+def queen_attacks(sq: int, occupied: int) -> int:
+    """
+    Gets the squares a queen on sq attacks
+    """
+    return bishop_attacks(sq, occupied) | rook_attacks(sq, occupied)
+
+
+class Bitboards:
+    """
+    Holds one bitboard per piece type and color plus occupancy masks. Game
+    keeps an instance in sync with its 2-d board so it can answer location
+    and attack questions without walking the board
+    Attributes:
+        pieces (list): pieces[color value][kind] bitboard of those pieces
+        occupancy (list): occupancy[color value] bitboard of that color
+        occupied (int): bitboard of every occupied square
+    """
+    def __init__(self, board: Optional[list] = None) -> None:
+        """
+        Creates empty bitboards, filled from a 2-d board if one is given
+        Parameters:
+            board (list): 2-d list of pieces to load
+        """
+        self.pieces = [[0] * 6, [0] * 6]
+        self.occupancy = [0, 0]
+        self.occupied = 0
+        if board is not None:
+            self.load(board)
+
+    def load(self, board: list) -> None:
+        """
+        Rebuilds every bitboard from a 2-d board
+        Parameters:
+            board (list): 2-d list of pieces
+        """
+        self.pieces = [[0] * 6, [0] * 6]
+        self.occupancy = [0, 0]
+        self.occupied = 0
+        for y in range(8):
+            for x in range(8):
+                if board[y][x] is not None:
+                    self.add(board[y][x], y * 8 + x)
+
+    def add(self, piece: Piece, sq: int) -> None:
+        """
+        Puts a piece on an empty square
+        Parameters:
+            piece (Piece): piece being added
+            sq (int): square index
+        """
+        bit = BITS[sq]
+        color = piece.color.value
+        self.pieces[color][KIND_INDEX[type(piece)]] |= bit
+        self.occupancy[color] |= bit
+        self.occupied |= bit
+
+    def remove(self, piece: Piece, sq: int) -> None:
+        """
+        Takes a piece off of its square
+        Parameters:
+            piece (Piece): piece being removed
+            sq (int): square index
+        """
+        bit = BITS[sq]
+        color = piece.color.value
+        self.pieces[color][KIND_INDEX[type(piece)]] &= ~bit
+        self.occupancy[color] &= ~bit
+        self.occupied &= ~bit
+
+    def move(self, piece: Piece, sq: int, sq2: int) -> None:
+        """
+        Moves a piece to an empty square
+        Parameters:
+            piece (Piece): piece being moved
+            sq (int): current square index
+            sq2 (int): desired square index
+        """
+        bits = BITS[sq] | BITS[sq2]
+        color = piece.color.value
+        self.pieces[color][KIND_INDEX[type(piece)]] ^= bits
+        self.occupancy[color] ^= bits
+        self.occupied ^= bits
+
+    def attacks(self, kind: int, color: Color, sq: int) -> int:
+        """
+        Gets the squares a piece would attack from a square
+        Parameters:
+            kind (int): index into KINDS
+            color (Color): color of the piece
+            sq (int): square index
+        Returns:
+            (int): bitboard of attacked squares
+        """
+        if kind == PAWN:
+            return PAWN_ATTACKS[color.value][sq]
+        if kind == KNIGHT:
+            return KNIGHT_ATTACKS[sq]
+        if kind == BISHOP:
+            return bishop_attacks(sq, self.occupied)
+        if kind == ROOK:
+            return rook_attacks(sq, self.occupied)
+        if kind == QUEEN:
+            return queen_attacks(sq, self.occupied)
+        return KING_ATTACKS[sq]
+
+    def is_attacked(self, sq: int, color: Color,
+                    occupied: Optional[int] = None) -> bool:
+        """
+        Looks outward from a square along knight, pawn, king and slider rays
+        for a piece of one color attacking it, stopping at the first one
+        Parameters:
+            sq (int): square index
+            color (Color): color of the attacking pieces
+            occupied (int): occupancy the sliders see, the current one if
+                            not given
+        Returns:
+            (bool): True if a piece of that color attacks the square
+        """
+        if occupied is None:
+            occupied = self.occupied
+        pieces = self.pieces[color.value]
+        if KNIGHT_ATTACKS[sq] & pieces[KNIGHT]:
+            return True
+        # A pawn attacks sq if a pawn of the other color on sq would attack
+        # the pawn's square
+        if PAWN_ATTACKS[1 - color.value][sq] & pieces[PAWN]:
+            return True
+        if KING_ATTACKS[sq] & pieces[KING]:
+            return True
+        diagonal = pieces[BISHOP] | pieces[QUEEN]
+        if diagonal:
+            for direction in DIAGONAL:
+                if ray_attacks(sq, direction, occupied) & diagonal:
+                    return True
+        orthogonal = pieces[ROOK] | pieces[QUEEN]
+        if orthogonal:
+            for direction in ORTHOGONAL:
+                if ray_attacks(sq, direction, occupied) & orthogonal:
+                    return True
+        return False
+
+    def attackers(self, sq: int, color: Color, occupied: int) -> int:
+        """
+        Gets every piece of one color that attacks a square
+        Parameters:
+            sq (int): square index
+            color (Color): color of the attacking pieces
+            occupied (int): occupancy the sliders see
+        Returns:
+            (int): bitboard of the attacking pieces
+        """
+        pieces = self.pieces[color.value]
+        return ((KNIGHT_ATTACKS[sq] & pieces[KNIGHT])
+                | (PAWN_ATTACKS[1 - color.value][sq] & pieces[PAWN])
+                | (KING_ATTACKS[sq] & pieces[KING])
+                | (bishop_attacks(sq, occupied)
+                   & (pieces[BISHOP] | pieces[QUEEN]))
+                | (rook_attacks(sq, occupied)
+                   & (pieces[ROOK] | pieces[QUEEN])))
+
+    def pins(self, sq: int, color: Color) -> dict[int, int]:
+        """
+        Finds the pieces of one color pinned to the king on a square. A
+        pinned piece may only move along the line between the king and the
+        piece pinning it
+        Parameters:
+            sq (int): square index of the king
+            color (Color): color of the king
+        Returns:
+            (dict): pinned square index -> bitboard of squares it may move to
+        """
+        pins = {}
+        own = self.occupancy[color.value]
+        enemy = self.pieces[1 - color.value]
+        for directions, sliders in (
+                (DIAGONAL, enemy[BISHOP] | enemy[QUEEN]),
+                (ORTHOGONAL, enemy[ROOK] | enemy[QUEEN])):
+            for direction in directions:
+                if not RAYS[direction][sq] & sliders:
+                    continue
+                # The first piece on the ray is pinned if it is ours and the
+                # next piece behind it is an enemy slider
+                blocker = ray_attacks(sq, direction, self.occupied) & own
+                if blocker:
+                    pinned = lsb(blocker)
+                    pinner = ray_attacks(pinned, direction,
+                                         self.occupied) & sliders
+                    if pinner:
+                        pinner = lsb(pinner)
+                        pins[pinned] = BETWEEN[sq][pinner] | BITS[pinner]
+        return pins
+
+    def attacked_squares(self, color: Color) -> int:
+        """
+        Gets every square attacked by the pieces of one color
+        Parameters:
+            color (Color): color of the attacking pieces
+        Returns:
+            (int): bitboard of attacked squares
+        """
+        attacked = 0
+        pieces = self.pieces[color.value]
+        for kind in range(6):
+            for sq in iter_squares(pieces[kind]):
+                attacked |= self.attacks(kind, color, sq)
+        return attacked
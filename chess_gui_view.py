@@ -1,15 +1,51 @@
+import queue
+import threading
+
 import pygame as pg
 import pygame_gui as gui
 from game import *
+from engine import MATE_BOUND, MATE_SCORE
+
+
+class SpriteCache:
+    """
+    Shared piece images keyed by (piece type, color). Each image is cut from
+    the spritesheet the first time it is drawn and reused for every piece of
+    that type and color after that
+    """
+    # Where each piece type sits in the spritesheet; white is the top row
+    SHEET_X = {King: 0, Queen: 104, Bishop: 210, Knight: 312, Rook: 420,
+               Pawn: 530}
+    SHEET_Y = {Color.WHITE: 0, Color.BLACK: 104}
+
+    def __init__(self, spritesheet: pg.Surface) -> None:
+        self._spritesheet = spritesheet
+        self._sprites = {}
+
+    def get(self, piece: Piece) -> pg.Surface:
+        key = (type(piece), piece.color)
+        sprite = self._sprites.get(key)
+        if sprite is None:
+            sprite = pg.Surface((105, 105), pg.SRCALPHA)
+            sprite.blit(self._spritesheet, (0, 0),
+                        pg.rect.Rect(SpriteCache.SHEET_X[key[0]],
+                                     SpriteCache.SHEET_Y[key[1]], 105, 105))
+            self._sprites[key] = sprite
+        return sprite
 
 
 class GUI:
+    # Moves shown by a hint and how long the analysis may run
+    HINT_LINES = 3
+    HINT_MS = 10000
+
     def __init__(self) -> None:
         pg.init()
         self._game = Game()
         self._screen = pg.display.set_mode((1440, 900))
         pg.display.set_caption("Laker Chess")
         self._pieces = pg.image.load("./images/pieces.png")
+        self._sprites = SpriteCache(self._pieces)
         self._ui_manager = gui.UIManager((1440, 900))
         self._side_box = gui.elements.UITextBox('<b>Laker Chess</b><br /><br />White moves first.<br />', relative_rect=pg.Rect((1000, 100), (400, 500)),
                                  manager=self._ui_manager)
@@ -17,6 +53,14 @@ class GUI:
                                      manager=self._ui_manager)
         self._restart_button = gui.elements.UIButton(relative_rect = pg.Rect((1200, 50), (100, 50)), text='Reset',
                                      manager=self._ui_manager)
+        self._hint_button = gui.elements.UIButton(relative_rect = pg.Rect((1100, 50), (100, 50)), text='Hint',
+                                     manager=self._ui_manager)
+        self._hint_box = gui.elements.UITextBox('', relative_rect=pg.Rect((1000, 620), (400, 220)),
+                                 manager=self._ui_manager)
+        # The hint is analysed on a copy of the game in another thread, which
+        # hands each finished depth to the event loop through the queue
+        self._hint_engine = None
+        self._hint_results = queue.Queue()
         self._piece_selected = False
         self._first_selected = (0, 0)
         self._second_selected = (0, 0)
@@ -39,9 +83,11 @@ class GUI:
                             continue
                         self._piece_selected = True
                         self._first_selected = y, x
-                        self._valid_moves = piece.valid_moves(y, x)
+                        self._valid_moves = [(m[2], m[3]) for m in self._game.legal_moves(piece.color)
+                                             if (m[0], m[1]) == (y, x)]
                         self._piece_selected = piece
                     elif self._piece_selected and (y, x) in self._valid_moves:
+                        self.__stop_hint__()
                         target = self._game.get(y, x)
                         moved = self._game.move(self._piece_selected, self._first_selected[0], self._first_selected[1], y, x)
                         if moved:
@@ -69,15 +115,20 @@ class GUI:
                     else:
                         self._piece_selected = False
                 if event.type == gui.UI_BUTTON_PRESSED:
+                    if event.ui_element == self._hint_button:
+                        self.__start_hint__()
                     if event.ui_element == self._restart_button:
+                        self.__stop_hint__()
                         self._game.reset()
                         self._side_box.set_text("Restarting game...<br />")
                     if event.ui_element == self._undo_button:
+                        self.__stop_hint__()
                         if self._game.undo():
                             self._side_box.append_html_text('Undoing move.<br />')
                         else:
                             self._side_box.append_html_text('Nothing to undo.<br />')
             self._ui_manager.process_events(event)
+            self.__show_hint__()
 
             self._screen.fill((255, 255, 255))
             self.__draw_board__()
@@ -87,6 +138,45 @@ class GUI:
             pg.display.flip()
             time_delta = clock.tick(30) / 1000.0
 
+    def __start_hint__(self) -> None:
+        self.__stop_hint__()
+        if not list(self._game.legal_moves(self._game.current_player)):
+            return
+        engine = Engine(self._game.copy())
+        self._hint_engine = engine
+        self._hint_box.set_text('Thinking...')
+        thread = threading.Thread(target=engine.analyse, daemon=True,
+                                  args=(self.HINT_LINES, MAX_DEPTH, self.HINT_MS),
+                                  kwargs={'callback': lambda lines: self._hint_results.put((engine, lines))})
+        thread.start()
+
+    def __stop_hint__(self) -> None:
+        if self._hint_engine is not None:
+            self._hint_engine.stop()
+            self._hint_engine = None
+            self._hint_box.set_text('')
+
+    def __show_hint__(self) -> None:
+        # Only the newest depth of the running analysis is shown; results
+        # of a stopped one are dropped
+        latest = None
+        while not self._hint_results.empty():
+            engine, lines = self._hint_results.get()
+            if engine is self._hint_engine:
+                latest = lines
+        if latest:
+            text = '<b>Hint</b> (depth ' + str(latest[0].depth) + ')<br />'
+            for line in latest:
+                text += self.__score_text__(line.score) + ' ' + ' '.join(move_name(move) for move in line.pv) + '<br />'
+            self._hint_box.set_text(text)
+
+    def __score_text__(self, score: int) -> str:
+        if score > MATE_BOUND:
+            return 'mate in ' + str((MATE_SCORE - score + 1) // 2)
+        if score < -MATE_BOUND:
+            return 'mated in ' + str((MATE_SCORE + score) // 2)
+        return '{:+.2f}'.format(score / 100)
+
     def __get_coords__(self, y, x):
         grid_x = x // 105
         grid_y = y // 105
@@ -107,8 +197,9 @@ class GUI:
                     pg.draw.rect(self._screen, (255, 0, 0), pg.rect.Rect(x * 105, y * 105, 105, 105), 2)
                 if self._valid_moves and self._piece_selected and (y, x) in self._valid_moves:
                     pg.draw.rect(self._screen, (0, 0, 255), pg.rect.Rect(x * 105, y * 105, 105, 105), 2)
-                if self._game.get(y, x):
-                    self._screen.blit(self._game.get(y, x)._image, (x * 105, y * 105))
+                piece = self._game.get(y, x)
+                if piece:
+                    self._screen.blit(self._sprites.get(piece), (x * 105, y * 105))
             count = count + 1
         pg.draw.line(self._screen, (0, 0, 0), (0, 840), (840, 840))
         pg.draw.line(self._screen, (0, 0, 0), (840, 840), (840, 0))
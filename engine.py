@@ -0,0 +1,678 @@
+# Final Project - Chess - CIS 163
+# Prof. Ira Woodring
+# Created by Clay Beal
+# - in association with Zachary Bauer
+from typing import Callable, NamedTuple, Optional
+import time
+
+from piece_model import Color
+from bitboard import KIND_INDEX, PIECE_VALUES, PAWN, QUEEN
+from move_picker import MovePicker, mvv_lva
+from transposition import TranspositionTable, EXACT, LOWER, UPPER
+from evaluation import full_evaluation
+from eval_cache import EvaluationCache
+
+# Score for mating; mates found sooner score higher
+MATE_SCORE = 100000
+# Scores beyond this are mates
+MATE_BOUND = MATE_SCORE - 1000
+INFINITY = 1000000
+DEFAULT_DEPTH = 3
+# Deepest iteration a time or node limited search will try
+MAX_DEPTH = 64
+# Most plies from the root any line can reach
+MAX_PLY = 128
+# Nodes searched between looks at the clock
+CLOCK_INTERVAL = 256
+# Slack given to a capture before delta pruning decides it cannot raise
+# alpha
+DELTA_MARGIN = 200
+# Null-move pruning: plies the reply to a null move is searched less deeply
+# by, and the least depth it is tried at
+NULL_MOVE_REDUCTION = 2
+NULL_MOVE_DEPTH = 3
+# Late-move reductions: quiet moves after this many moves are searched one
+# ply less deeply, at depths of at least LMR_DEPTH
+LMR_MOVES = 3
+LMR_DEPTH = 3
+# Futility pruning: margin by which the static evaluation must miss alpha
+# for quiet moves to be skipped, indexed by the plies left
+FUTILITY_MARGINS = (0, 200, 500)
+# Aspiration windows: half width of the first window around the score of the
+# previous depth, and the width past which a failing window is opened fully
+ASPIRATION_WINDOW = 50
+ASPIRATION_LIMIT = 800
+
+
+def material_evaluation(game) -> int:
+    """
+    Scores a position by material alone
+    Parameters:
+        game (Game): game to score
+    Returns:
+        (int): score in centipawns from the point of view of the player to
+               move
+    """
+    white, black = game._bitboards.pieces
+    score = 0
+    for kind, value in enumerate(PIECE_VALUES):
+        score += value * (white[kind].bit_count() - black[kind].bit_count())
+    if game.current_player == Color.WHITE:
+        return score
+    return -score
+
+
+def _score_to_table(score: int, ply: int) -> int:
+    """
+    Makes a mate score relative to the position being stored instead of the
+    root, so it stays right when the position is reached at another ply
+    """
+    if score > MATE_BOUND:
+        return score + ply
+    if score < -MATE_BOUND:
+        return score - ply
+    return score
+
+
+def _score_from_table(score: int, ply: int) -> int:
+    """
+    Makes a stored mate score relative to the root again
+    """
+    if score > MATE_BOUND:
+        return score - ply
+    if score < -MATE_BOUND:
+        return score + ply
+    return score
+
+
+class SearchFeatures(NamedTuple):
+    """
+    Switches for the selective parts of the search; turning them all off
+    gives plain alpha-beta with the same move ordering and quiescence search
+    Attributes:
+        null_move (bool): prune positions that are still good enough after
+                          passing the turn, except in pawn endings
+        late_move_reductions (bool): search late quiet moves less deeply
+        futility (bool): skip quiet moves near the leaves that cannot bring
+                         the score up to alpha
+        pvs (bool): search moves after the first with a null window
+                    (principal variation search)
+        aspiration (bool): search each depth with a window around the score
+                           of the previous one
+    """
+    null_move: bool = True
+    late_move_reductions: bool = True
+    futility: bool = True
+    pvs: bool = True
+    aspiration: bool = True
+
+
+# Plain alpha-beta, for comparing node counts
+NO_FEATURES = SearchFeatures(False, False, False, False, False)
+
+
+class AnalysisLine(NamedTuple):
+    """
+    One of the best moves found by a multi-PV analysis
+    Attributes:
+        move (tuple): the move as (y, x, y2, x2)
+        score (int): its score for the player to move
+        pv (tuple): principal variation, the line of best play expected
+                    after it, starting with the move itself
+        depth (int): plies the move was searched to
+    """
+    move: tuple
+    score: int
+    pv: tuple
+    depth: int
+
+
+class SearchAborted(Exception):
+    """
+    Raised inside the search when its time or node budget runs out, or it
+    is stopped
+    """
+    pass
+
+
+class Engine:
+    """
+    Searches a game for the best move using negamax with alpha-beta pruning.
+    Moves are made and taken back in place on the game being searched
+    Attributes:
+        _game (Game): game being searched
+        evaluate (callable): scores a position for the player to move
+        table (TranspositionTable): results shared between searches
+        eval_cache (EvaluationCache): static evaluations shared between
+                                      searches, or None to not cache them
+        features (SearchFeatures): selective search techniques in use
+        nodes (int): positions visited by the main part of the last search
+        qnodes (int): positions visited by its quiescence search
+        depth_reached (int): deepest iteration the last search completed
+    """
+    def __init__(self, game, evaluate: Optional[Callable] = None,
+                 table: Optional[TranspositionTable] = None,
+                 eval_cache: Optional[EvaluationCache] = None,
+                 features: Optional[SearchFeatures] = None) -> None:
+        """
+        Creates an engine for a game
+        Parameters:
+            game (Game): game to search
+            evaluate (callable): function taking the game and returning a
+                                 score for the player to move; material,
+                                 piece-square tables and pawn structure
+                                 if not given
+            table (TranspositionTable): table to store results in; a new
+                                        default sized one if not given
+            eval_cache (EvaluationCache): cache for the scores of evaluate;
+                                          nothing is cached if not given
+            features (SearchFeatures): selective search techniques to use;
+                                       all of them if not given
+        """
+        self._game = game
+        self.evaluate = evaluate or full_evaluation
+        self.table = table if table is not None else TranspositionTable()
+        self.eval_cache = eval_cache
+        self.features = features if features is not None \
+            else SearchFeatures()
+        self.nodes = 0
+        self.qnodes = 0
+        self.depth_reached = 0
+        self._deadline = None
+        self._max_nodes = None
+        self._root_best = None
+        self._stopped = False
+        # Two killer moves per ply and a history score per move for each
+        # color, both learned while searching
+        self._killers = [[None, None] for _ in range(MAX_PLY)]
+        self._history = [{}, {}]
+
+    def search(self, depth: int = DEFAULT_DEPTH, time_ms: Optional[int] = None,
+               max_nodes: Optional[int] = None,
+               start_depth: int = 1) -> tuple[Optional[tuple], int]:
+        """
+        Searches the position of the player to move with iterative deepening:
+        depth 1, then 2, and so on up to depth. If the time or node budget
+        runs out, the result of the last completed depth is returned
+        Parameters:
+            depth (int): deepest number of moves (plies) to look ahead
+            time_ms (int): wall-clock budget in milliseconds, no limit if
+                           not given
+            max_nodes (int): node budget, no limit if not given
+            start_depth (int): first depth to search
+        Returns:
+            (tuple): best move as (y, x, y2, x2), or None if there is no
+                     legal move, and its score
+        """
+        self._start(time_ms, max_nodes)
+        moves = list(self._game.legal_moves(self._game.current_player))
+        if not moves:
+            return None, self._terminal_score(0)
+        best_move, best_score = moves[0], -INFINITY
+        for current_depth in range(min(start_depth, depth), depth + 1):
+            try:
+                best_move, best_score = self._aspiration(current_depth,
+                                                         best_score)
+            except SearchAborted:
+                # Falls back on the best move of the unfinished depth only
+                # if no depth was completed
+                if self.depth_reached == 0 and self._root_best is not None:
+                    best_move, best_score = self._root_best
+                break
+            self.depth_reached = current_depth
+            # Nothing to gain from searching deeper once a mate is found
+            if abs(best_score) > MATE_BOUND:
+                break
+        return best_move, best_score
+
+    def analyse(self, lines: int = 3, depth: int = DEFAULT_DEPTH,
+                time_ms: Optional[int] = None, max_nodes: Optional[int] = None,
+                callback: Optional[Callable] = None) -> list[AnalysisLine]:
+        """
+        Finds the best few moves of the player to move with their scores and
+        principal variations (multi-PV), deepening one ply at a time. At each
+        depth the root is searched once per line, leaving out the moves
+        already found
+        Parameters:
+            lines (int): number of moves to find
+            depth (int): deepest number of plies to look ahead
+            time_ms (int): wall-clock budget in milliseconds, no limit if
+                           not given
+            max_nodes (int): node budget, no limit if not given
+            callback (callable): called with the lines of each depth as it
+                                 completes
+        Returns:
+            (list): AnalysisLines of the last completed depth, best first;
+                    empty if there is no legal move or no depth completed
+        """
+        self._start(time_ms, max_nodes)
+        moves = list(self._game.legal_moves(self._game.current_player))
+        lines = min(lines, len(moves))
+        result = []
+        for current_depth in range(1, depth + 1):
+            found = []
+            excluded = []
+            try:
+                for _ in range(lines):
+                    move, score = self._search_root(current_depth, -INFINITY,
+                                                    INFINITY, excluded)
+                    excluded.append(move)
+                    found.append(AnalysisLine(
+                        move, score,
+                        self._principal_variation(move, current_depth),
+                        current_depth))
+            except SearchAborted:
+                break
+            found.sort(key=lambda line: line.score, reverse=True)
+            result = found
+            self.depth_reached = current_depth
+            if callback is not None:
+                callback(result)
+        return result
+
+    def stop(self) -> None:
+        """
+        Stops a search running in another thread; it returns as if its
+        budget had run out. Later searches by this engine stop at once too
+        """
+        self._stopped = True
+
+    def _start(self, time_ms: Optional[int], max_nodes: Optional[int]) -> None:
+        """
+        Resets the counters and sets the budget for a new search
+        Parameters:
+            time_ms (int): wall-clock budget in milliseconds, or None
+            max_nodes (int): node budget, or None
+        """
+        self.nodes = 0
+        self.qnodes = 0
+        self.depth_reached = 0
+        self._deadline = None
+        if time_ms is not None:
+            self._deadline = time.perf_counter() + time_ms / 1000
+        self._max_nodes = max_nodes
+        self._root_best = None
+        self.table.new_search()
+
+    def _principal_variation(self, move: tuple, depth: int) -> tuple:
+        """
+        Follows the best moves stored in the transposition table from the
+        position after a move
+        Parameters:
+            move (tuple): first move of the line
+            depth (int): most moves the line can have
+        Returns:
+            (tuple): moves of the line, starting with move
+        """
+        game = self._game
+        line = [move]
+        records = [game.make_move(*move)]
+        seen = {game.zobrist_key}
+        try:
+            while len(line) < depth:
+                entry = self.table.probe(game.zobrist_key)
+                if entry is None or entry.move is None or \
+                        not game.is_legal(entry.move):
+                    break
+                line.append(entry.move)
+                records.append(game.make_move(*entry.move))
+                # A repeated position would repeat the line forever
+                if game.zobrist_key in seen:
+                    break
+                seen.add(game.zobrist_key)
+        finally:
+            for record in reversed(records):
+                game.unmake_move(record)
+        return tuple(line)
+
+    def _aspiration(self, depth: int, previous: int) -> tuple[tuple, int]:
+        """
+        Searches the root to one depth, first with a narrow window around
+        the score of the previous depth if aspiration windows are on. A
+        score outside the window is only a bound, so the window is widened
+        on that side and the depth searched again
+        Parameters:
+            depth (int): plies to search
+            previous (int): score of the previous depth
+        Returns:
+            (tuple): best move and its score
+        """
+        if not self.features.aspiration or depth == 1 or \
+                abs(previous) > MATE_BOUND:
+            return self._search_root(depth, -INFINITY, INFINITY)
+        delta = ASPIRATION_WINDOW
+        alpha, beta = previous - delta, previous + delta
+        while True:
+            move, score = self._search_root(depth, alpha, beta)
+            if alpha < score < beta:
+                return move, score
+            delta *= 2
+            if score <= alpha:
+                alpha = previous - delta if delta < ASPIRATION_LIMIT \
+                    else -INFINITY
+            else:
+                beta = previous + delta if delta < ASPIRATION_LIMIT \
+                    else INFINITY
+
+    def _search_root(self, depth: int, alpha: int, beta: int,
+                     excluded: list = ()) -> tuple[tuple, int]:
+        """
+        Searches every root move to one depth
+        Parameters:
+            depth (int): plies to search
+            alpha (int): lower end of the window
+            beta (int): upper end of the window
+            excluded (list): moves to leave out, for multi-PV; the result
+                             is not stored in the table if there are any
+        Returns:
+            (tuple): best move and its score; the score is alpha if no move
+                     reached the window and at least beta if one passed it
+        """
+        game = self._game
+        original_alpha = alpha
+        best_move = None
+        entry = self.table.probe(game.zobrist_key)
+        hash_move = entry.move if entry is not None else None
+        moves = [move for move in MovePicker(game, hash_move)
+                 if move not in excluded]
+        for move in moves:
+            record = game.make_move(*move)
+            try:
+                if best_move is None:
+                    score = -self._negamax(depth - 1, -beta, -alpha, 1, True)
+                elif not self.features.pvs:
+                    score = -self._negamax(depth - 1, -beta, -alpha, 1)
+                else:
+                    score = -self._negamax(depth - 1, -alpha - 1, -alpha, 1)
+                    if alpha < score < beta:
+                        score = -self._negamax(depth - 1, -beta, -alpha, 1,
+                                               True)
+            finally:
+                game.unmake_move(record)
+            if score >= beta:
+                if not excluded:
+                    self.table.store(game.zobrist_key, depth, LOWER, score,
+                                     move)
+                return move, score
+            if score > alpha or best_move is None:
+                if score > alpha:
+                    alpha = score
+                best_move = move
+                self._root_best = (best_move, alpha)
+        if not excluded:
+            bound = EXACT if alpha > original_alpha else UPPER
+            self.table.store(game.zobrist_key, depth, bound, alpha, best_move)
+        return best_move, alpha
+
+    def _check_budget(self) -> None:
+        """
+        Raises SearchAborted once the node or time budget is used up;
+        quiescence nodes count towards the budget too
+        """
+        if self._stopped:
+            raise SearchAborted()
+        nodes = self.nodes + self.qnodes
+        if self._max_nodes is not None and nodes >= self._max_nodes:
+            raise SearchAborted()
+        if self._deadline is not None and nodes % CLOCK_INTERVAL == 0 \
+                and time.perf_counter() >= self._deadline:
+            raise SearchAborted()
+
+    def _negamax(self, depth: int, alpha: int, beta: int, ply: int,
+                 pv: bool = False, allow_null: bool = True) -> int:
+        """
+        Scores the current position for the player to move
+        Parameters:
+            depth (int): plies left to search
+            alpha (int): score the player to move is already guaranteed
+            beta (int): score the opponent is already guaranteed
+            ply (int): plies from the root
+            pv (bool): True if the position is on the principal variation,
+                       the line of best moves found so far
+            allow_null (bool): False right after a null move, so two are
+                               never made in a row
+        Returns:
+            (int): score of the position
+        """
+        # Leaves are settled by the quiescence search instead of being
+        # scored in the middle of an exchange
+        if depth <= 0:
+            return self._quiescence(alpha, beta, ply)
+        self.nodes += 1
+        self._check_budget()
+
+        game = self._game
+        key = game.zobrist_key
+        # A stored result searched at least as deep can settle the position
+        # without searching it again
+        entry = self.table.probe(key)
+        hash_move = None
+        if entry is not None:
+            hash_move = entry.move
+            if entry.depth >= depth:
+                score = _score_from_table(entry.score, ply)
+                if entry.bound == EXACT or \
+                        (entry.bound == LOWER and score >= beta) or \
+                        (entry.bound == UPPER and score <= alpha):
+                    return score
+
+        features = self.features
+        color = game.current_player
+        in_check = game.check(color)
+        # Positions on the principal variation are never pruned
+        static = None
+        if not pv and not in_check and ply < MAX_PLY - 1:
+            if (features.null_move and depth >= NULL_MOVE_DEPTH) or \
+                    (features.futility and depth < len(FUTILITY_MARGINS)):
+                static = self._evaluate()
+
+        # If passing the turn still leaves the score above beta, a real move
+        # would too. Not in pawn endings, where having to move can be the
+        # only thing that loses (zugzwang)
+        if static is not None and features.null_move and allow_null and \
+                depth >= NULL_MOVE_DEPTH and static >= beta and \
+                game.has_non_pawn_material(color):
+            game.make_null_move()
+            try:
+                score = -self._negamax(depth - 1 - NULL_MOVE_REDUCTION, -beta,
+                                       -beta + 1, ply + 1, False, False)
+            finally:
+                game.unmake_null_move()
+            if score >= beta:
+                # A mate found after passing is not a proven mate
+                return beta if score > MATE_BOUND else score
+
+        # Near the leaves, quiet moves cannot make up a large deficit
+        futile = static is not None and features.futility and \
+            depth < len(FUTILITY_MARGINS) and \
+            static + FUTILITY_MARGINS[depth] <= alpha
+
+        history = self._history[color.value]
+        killers = self._killers[ply]
+        picker = MovePicker(game, hash_move, killers, history)
+        original_alpha = alpha
+        best_move = None
+        searched = 0
+        for move in picker:
+            searched += 1
+            quiet = not game.is_tactical(move)
+            record = game.make_move(*move)
+            try:
+                reduction = 0
+                if quiet and not in_check and searched > 1 and \
+                        (futile or (features.late_move_reductions and
+                                    searched > LMR_MOVES and
+                                    depth >= LMR_DEPTH and
+                                    move not in killers)) and \
+                        not game.check(game.current_player):
+                    if futile:
+                        continue
+                    reduction = 1
+                score = self._search_move(depth - 1, alpha, beta, ply + 1,
+                                          reduction, searched == 1, pv)
+            finally:
+                game.unmake_move(record)
+            if score >= beta:
+                # Quiet moves that refute a position are tried early in
+                # sibling positions and whenever they come up again
+                if quiet:
+                    self._add_killer(ply, move)
+                    history[move] = history.get(move, 0) + depth * depth
+                self.table.store(key, depth, LOWER,
+                                 _score_to_table(score, ply), move)
+                return score
+            if score > alpha:
+                alpha = score
+                best_move = move
+
+        if searched == 0:
+            score = self._terminal_score(ply)
+            self.table.store(key, depth, EXACT, _score_to_table(score, ply),
+                             None)
+            return score
+        bound = EXACT if alpha > original_alpha else UPPER
+        self.table.store(key, depth, bound, _score_to_table(alpha, ply),
+                         best_move)
+        return alpha
+
+    def _search_move(self, depth: int, alpha: int, beta: int, ply: int,
+                     reduction: int, first: bool, pv: bool) -> int:
+        """
+        Searches the position after a move, from the point of view of the
+        player who made it. With principal variation search, moves after
+        the first only have to show they are no better than alpha, which a
+        null window does more cheaply; a reduced move is searched again at
+        full depth if it turns out better than alpha
+        Parameters:
+            depth (int): plies left to search after the move
+            alpha (int): score the player who moved is already guaranteed
+            beta (int): score the opponent is already guaranteed
+            ply (int): plies from the root after the move
+            reduction (int): plies taken off the depth for a late move
+            first (bool): True for the first move searched in the position
+            pv (bool): True if the position before the move is on the
+                       principal variation
+        Returns:
+            (int): score of the move
+        """
+        if reduction:
+            score = -self._negamax(depth - reduction, -alpha - 1, -alpha, ply)
+            if score <= alpha:
+                return score
+        if not first and self.features.pvs:
+            score = -self._negamax(depth, -alpha - 1, -alpha, ply)
+            if score <= alpha or score >= beta:
+                return score
+        # Only a full window search of the best move so far continues the
+        # principal variation
+        return -self._negamax(depth, -beta, -alpha, ply,
+                              pv and (first or self.features.pvs))
+
+    def _quiescence(self, alpha: int, beta: int, ply: int) -> int:
+        """
+        Extends a leaf with captures and promotions only until the position
+        is quiet. The player to move may stand pat on the static evaluation
+        instead of capturing, and captures that could not raise alpha even
+        after winning the piece plus a margin are skipped (delta pruning),
+        as are captures that lose material by static exchange evaluation.
+        In check every evasion is searched and there is no standing pat
+        Parameters:
+            alpha (int): score the player to move is already guaranteed
+            beta (int): score the opponent is already guaranteed
+            ply (int): plies from the root
+        Returns:
+            (int): score of the position
+        """
+        self.qnodes += 1
+        self._check_budget()
+        game = self._game
+        if ply >= MAX_PLY - 1:
+            return self._evaluate()
+        color = game.current_player
+        in_check = game.check(color)
+
+        board = game._board
+        if in_check:
+            moves = list(game.legal_moves(color))
+            if not moves:
+                return -MATE_SCORE + ply
+            stand_pat = -INFINITY
+        else:
+            stand_pat = self._evaluate()
+            if stand_pat >= beta:
+                return stand_pat
+            if stand_pat > alpha:
+                alpha = stand_pat
+            moves = list(game.legal_moves(color, tactical=True))
+        moves.sort(key=lambda move: mvv_lva(board, move), reverse=True)
+
+        best = stand_pat
+        for move in moves:
+            if not in_check:
+                victim = board[move[2]][move[3]]
+                gain = DELTA_MARGIN
+                if victim is not None:
+                    gain += PIECE_VALUES[KIND_INDEX[type(victim)]]
+                if move[2] in (0, 7) and \
+                        KIND_INDEX[type(board[move[0]][move[1]])] == PAWN:
+                    gain += PIECE_VALUES[QUEEN] - PIECE_VALUES[PAWN]
+                if stand_pat + gain <= alpha:
+                    continue
+                # Captures that lose material in the exchange are not worth
+                # searching
+                if game.see(move) < 0:
+                    continue
+            record = game.make_move(*move)
+            try:
+                score = -self._quiescence(-beta, -alpha, ply + 1)
+            finally:
+                game.unmake_move(record)
+            if score > best:
+                best = score
+            if score >= beta:
+                return score
+            if score > alpha:
+                alpha = score
+        return best
+
+    def _evaluate(self) -> int:
+        """
+        Scores the current position with the evaluation function, through
+        the evaluation cache if there is one
+        Returns:
+            (int): score for the player to move
+        """
+        cache = self.eval_cache
+        if cache is None:
+            return self.evaluate(self._game)
+        key = self._game.zobrist_key
+        score = cache.probe(key)
+        if score is None:
+            score = self.evaluate(self._game)
+            cache.store(key, score)
+        return score
+
+    def _add_killer(self, ply: int, move: tuple) -> None:
+        """
+        Remembers a quiet move that caused a cutoff at a ply, keeping the
+        two most recent ones
+        Parameters:
+            ply (int): plies from the root
+            move (tuple): move as (y, x, y2, x2)
+        """
+        killers = self._killers[ply]
+        if killers[0] != move:
+            killers[1] = killers[0]
+            killers[0] = move
+
+    def _terminal_score(self, ply: int) -> int:
+        """
+        Scores a position where the player to move has no legal moves
+        Parameters:
+            ply (int): plies from the root
+        Returns:
+            (int): mated score, or 0 for stalemate
+        """
+        if self._game.check(self._game.current_player):
+            return -MATE_SCORE + ply
+        return 0
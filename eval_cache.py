@@ -0,0 +1,107 @@
+# Final Project - Chess - CIS 163
+# Prof. Ira Woodring
+# Created by Clay Beal
+# - in association with Zachary Bauer
+from typing import Optional
+
+# Eviction policies: a new score always takes its slot, or slots come in
+# pairs where scores that were looked up again are kept in the first tier and
+# new scores only replace the second
+ALWAYS_REPLACE, TWO_TIER = range(2)
+
+DEFAULT_EVAL_ENTRIES = 1 << 16
+
+
+class EvaluationCache:
+    """
+    Fixed-size cache of static evaluations indexed by the low bits of the
+    Zobrist key. The same leaf is often reached through transpositions within
+    a search and again in the search for the next move, so it is only scored
+    once
+    Attributes:
+        size (int): number of slots, a power of two
+        policy (int): ALWAYS_REPLACE or TWO_TIER
+        hits (int): probes that found their position
+        misses (int): probes that did not
+        evictions (int): stores that replaced another position's score
+    """
+    def __init__(self, entries: int = DEFAULT_EVAL_ENTRIES,
+                 policy: int = ALWAYS_REPLACE) -> None:
+        """
+        Creates an empty cache
+        Parameters:
+            entries (int): entry cap; the cache gets the largest power of two
+                           slots that fits
+            policy (int): ALWAYS_REPLACE or TWO_TIER
+        """
+        if policy not in (ALWAYS_REPLACE, TWO_TIER):
+            raise ValueError(f'unknown eviction policy {policy}')
+        self.size = 1 << (max(2, entries).bit_length() - 1)
+        self.policy = policy
+        # Two-tier slots are pairs: an even slot and the odd one after it
+        self._mask = self.size - 1 if policy == ALWAYS_REPLACE \
+            else self.size - 2
+        self._keys = [None] * self.size
+        self._scores = [0] * self.size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def clear(self) -> None:
+        """
+        Empties the cache and zeroes its counters
+        """
+        self._keys = [None] * self.size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def probe(self, key: int) -> Optional[int]:
+        """
+        Looks up the evaluation of a position
+        Parameters:
+            key (int): Zobrist key of the position
+        Returns:
+            (int): cached score, or None if the position is not cached
+        """
+        index = key & self._mask
+        keys = self._keys
+        if keys[index] == key:
+            self.hits += 1
+            return self._scores[index]
+        if self.policy == TWO_TIER and keys[index + 1] == key:
+            # Moves a score that is used again into the first tier, and the
+            # score it displaces into the second
+            self.hits += 1
+            scores = self._scores
+            score = scores[index + 1]
+            keys[index + 1], scores[index + 1] = keys[index], scores[index]
+            keys[index], scores[index] = key, score
+            return score
+        self.misses += 1
+        return None
+
+    def store(self, key: int, score: int) -> None:
+        """
+        Stores the evaluation of a position, following the eviction policy
+        Parameters:
+            key (int): Zobrist key of the position
+            score (int): its static evaluation
+        """
+        index = key & self._mask
+        if self.policy == TWO_TIER and self._keys[index] is not None \
+                and self._keys[index] != key:
+            index += 1
+        if self._keys[index] is not None and self._keys[index] != key:
+            self.evictions += 1
+        self._keys[index] = key
+        self._scores[index] = score
+
+    def usage(self) -> int:
+        """
+        Gets how full the cache is
+        Returns:
+            (int): per mille of slots in use
+        """
+        used = sum(1 for key in self._keys if key is not None)
+        return used * 1000 // self.size
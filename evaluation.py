@@ -0,0 +1,144 @@
+# Final Project - Chess - CIS 163
+# Prof. Ira Woodring
+# Created by Clay Beal
+# - in association with Zachary Bauer
+from piece_model import Color
+from bitboard import KIND_INDEX, PIECE_VALUES
+
+# Piece-square tables in centipawns, indexed by square from white's point of
+# view: the first row is the far side of the board (y = 0), where white
+# pawns promote. Black uses the same tables mirrored top to bottom
+PAWN_TABLE = (
+      0,   0,   0,   0,   0,   0,   0,   0,
+     50,  50,  50,  50,  50,  50,  50,  50,
+     10,  10,  20,  30,  30,  20,  10,  10,
+      5,   5,  10,  25,  25,  10,   5,   5,
+      0,   0,   0,  20,  20,   0,   0,   0,
+      5,  -5, -10,   0,   0, -10,  -5,   5,
+      5,  10,  10, -20, -20,  10,  10,   5,
+      0,   0,   0,   0,   0,   0,   0,   0,
+)
+KNIGHT_TABLE = (
+    -50, -40, -30, -30, -30, -30, -40, -50,
+    -40, -20,   0,   0,   0,   0, -20, -40,
+    -30,   0,  10,  15,  15,  10,   0, -30,
+    -30,   5,  15,  20,  20,  15,   5, -30,
+    -30,   0,  15,  20,  20,  15,   0, -30,
+    -30,   5,  10,  15,  15,  10,   5, -30,
+    -40, -20,   0,   5,   5,   0, -20, -40,
+    -50, -40, -30, -30, -30, -30, -40, -50,
+)
+BISHOP_TABLE = (
+    -20, -10, -10, -10, -10, -10, -10, -20,
+    -10,   0,   0,   0,   0,   0,   0, -10,
+    -10,   0,   5,  10,  10,   5,   0, -10,
+    -10,   5,   5,  10,  10,   5,   5, -10,
+    -10,   0,  10,  10,  10,  10,   0, -10,
+    -10,  10,  10,  10,  10,  10,  10, -10,
+    -10,   5,   0,   0,   0,   0,   5, -10,
+    -20, -10, -10, -10, -10, -10, -10, -20,
+)
+ROOK_TABLE = (
+      0,   0,   0,   0,   0,   0,   0,   0,
+      5,  10,  10,  10,  10,  10,  10,   5,
+     -5,   0,   0,   0,   0,   0,   0,  -5,
+     -5,   0,   0,   0,   0,   0,   0,  -5,
+     -5,   0,   0,   0,   0,   0,   0,  -5,
+     -5,   0,   0,   0,   0,   0,   0,  -5,
+     -5,   0,   0,   0,   0,   0,   0,  -5,
+      0,   0,   0,   5,   5,   0,   0,   0,
+)
+QUEEN_TABLE = (
+    -20, -10, -10,  -5,  -5, -10, -10, -20,
+    -10,   0,   0,   0,   0,   0,   0, -10,
+    -10,   0,   5,   5,   5,   5,   0, -10,
+     -5,   0,   5,   5,   5,   5,   0,  -5,
+      0,   0,   5,   5,   5,   5,   0,  -5,
+    -10,   5,   5,   5,   5,   5,   0, -10,
+    -10,   0,   5,   0,   0,   0,   0, -10,
+    -20, -10, -10,  -5,  -5, -10, -10, -20,
+)
+KING_TABLE = (
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -20, -30, -30, -40, -40, -30, -30, -20,
+    -10, -20, -20, -20, -20, -20, -20, -10,
+     20,  20,   0,   0,   0,   0,  20,  20,
+     20,  30,  10,   0,   0,  10,  30,  20,
+)
+# Indexed by kind, in the order of bitboard.KINDS
+PIECE_SQUARE_TABLES = (PAWN_TABLE, KNIGHT_TABLE, BISHOP_TABLE, ROOK_TABLE,
+                       QUEEN_TABLE, KING_TABLE)
+
+# SQUARE_SCORES[color value][kind][square]: material plus piece-square
+# score of a piece standing on a square, positive for white and negative for
+# black, so a position's score is the sum over its pieces
+SQUARE_SCORES = (
+    tuple(tuple(PIECE_VALUES[kind] + table[sq] for sq in range(64))
+          for kind, table in enumerate(PIECE_SQUARE_TABLES)),
+    tuple(tuple(-PIECE_VALUES[kind] - table[sq ^ 56] for sq in range(64))
+          for kind, table in enumerate(PIECE_SQUARE_TABLES)),
+)
+
+
+def square_score(piece, sq: int) -> int:
+    """
+    Gets the material plus piece-square score of a piece on a square
+    Parameters:
+        piece (Piece): piece on the square
+        sq (int): square index
+    Returns:
+        (int): score in centipawns, positive for white
+    """
+    return SQUARE_SCORES[piece.color.value][KIND_INDEX[type(piece)]][sq]
+
+
+def score_board(board: list) -> int:
+    """
+    Computes the material plus piece-square score of a board from scratch
+    Parameters:
+        board (list): 2-d list of pieces
+    Returns:
+        (int): score in centipawns, positive when white is ahead
+    """
+    score = 0
+    for y in range(8):
+        for x in range(8):
+            if board[y][x] is not None:
+                score += square_score(board[y][x], y * 8 + x)
+    return score
+
+
+def full_evaluation(game) -> int:
+    """
+    Scores a position by material, piece-square tables and pawn structure.
+    The first two are read from the game's running score and the pawn
+    structure comes from its pawn table unless the pawns have changed into
+    a structure not seen before
+    Parameters:
+        game (Game): game to score
+    Returns:
+        (int): score in centipawns from the point of view of the player to
+               move
+    """
+    score = game.score + game.pawn_structure.score
+    if game.current_player == Color.WHITE:
+        return score
+    return -score
+
+
+def piece_square_evaluation(game) -> int:
+    """
+    Scores a position by material and piece-square tables, reading the
+    running score the game keeps up to date as moves are made and taken back
+    Parameters:
+        game (Game): game to score
+    Returns:
+        (int): score in centipawns from the point of view of the player to
+               move
+    """
+    if game.current_player == Color.WHITE:
+        return game.score
+    return -game.score
@@ -2,10 +2,71 @@
 # Prof. Ira Woodring
 # Created by Clay Beal
 # - in association with Zachary Bauer
-from typing import Optional
-import random
+from typing import Callable, Iterator, NamedTuple, Optional
 
 from piece_model import Color, Rook, King, Knight, Queen, Bishop, Pawn, Piece
+from bitboard import Bitboards, SQUARES, BITS, FULL, BETWEEN, KIND_INDEX, \
+    PIECE_VALUES, PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING, KNIGHT_ATTACKS, \
+    KING_ATTACKS, PAWN_ATTACKS, PAWN_PUSH_SQUARES, PROMOTION_SQUARES, \
+    bishop_attacks, rook_attacks, queen_attacks, iter_squares, lsb
+from zobrist import BLACK_TO_MOVE_KEY, PIECE_KEYS, hash_position, \
+    pawn_hash, piece_key
+from evaluation import score_board, square_score
+from engine import Engine, DEFAULT_DEPTH, MAX_DEPTH
+from transposition import TranspositionTable
+from eval_cache import EvaluationCache
+from smp import SharedTranspositionTable, parallel_search
+from pawns import PawnTable
+
+
+class UndoRecord(NamedTuple):
+    """
+    Everything unmake_move needs to take back a move made by make_move
+    Attributes:
+        piece (Piece): piece that moved
+        y (int): y coordinate it moved from
+        x (int): x coordinate it moved from
+        y2 (int): y coordinate it moved to
+        x2 (int): x coordinate it moved to
+        captured (Piece): piece that was on (y2, x2), or None
+        moved (bool): the pawn's moved flag before the move, None if the
+                      piece is not a pawn
+        promoted (Piece): queen the pawn promoted to, or None
+        hash (int): Zobrist key of the position before the move
+        score (int): material and piece-square score before the move
+        pawn_hash (int): pawn Zobrist key of the position before the move
+    """
+    piece: Piece
+    y: int
+    x: int
+    y2: int
+    x2: int
+    captured: Optional[Piece]
+    moved: Optional[bool]
+    promoted: Optional[Piece]
+    hash: int
+    score: int
+    pawn_hash: int
+
+
+def move_name(move: tuple[int, int, int, int]) -> str:
+    """
+    Names a move by its from and to squares, files a-h from left to right
+    and ranks 1-8 from white's side, like e2e4
+    Parameters:
+        move (tuple): move as (y, x, y2, x2)
+    Returns:
+        (str): name of the move
+    """
+    y, x, y2, x2 = move
+    return 'abcdefgh'[x] + str(8 - y) + 'abcdefgh'[x2] + str(8 - y2)
+
+
+# FEN letters of the white pieces; black pieces use the lower case letter
+FEN_LETTERS = {Pawn: 'P', Knight: 'N', Bishop: 'B', Rook: 'R', Queen: 'Q',
+               King: 'K'}
+FEN_PIECES = {letter: kind for kind, letter in FEN_LETTERS.items()}
+START_FEN = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w - - 0 1'
 
 
 class Game:
@@ -16,24 +77,214 @@ class Game:
     Attributes:
         _board (list): Holds the current 2-d list of pieces on the board
         current_player (Enum): Holds the color enum for the current player
-        _prior_states (list): Holds the prior states of the board via stack
+        _prior_states (list): Holds the undo records of the moves made via
+                              stack
+        _first_move (int): Full move number of the position the game
+                           started from
+        _first_player (Enum): Player to move in the position the game
+                              started from
+        _bitboards (Bitboards): Bitboard copy of _board used for fast
+                                location and attack queries; its occupancy
+                                masks are the per-color piece sets
+        _king_squares (list): Square index of each color's king, indexed by
+                              color value
+        _hash (int): Zobrist key of the position, kept up to date by
+                     make_move and unmake_move
+        _score (int): Material and piece-square score of the position,
+                      positive when white is ahead, kept up to date the same
+                      way
+        _pawn_hash (int): Zobrist key of the pawns alone, kept up to date
+                          the same way
+        pawn_table (PawnTable): Cached pawn structure scores
+        evaluation_cache (EvaluationCache): Static evaluations kept between
+                                            computer moves, created on
+                                            first use
+        _accumulator (Accumulator): Network accumulator kept up to date by
+                                    make_move and unmake_move, None unless
+                                    one is attached
+        transposition_table (TranspositionTable): Search results kept
+                                                  between computer moves,
+                                                  created on first use
+        shared_table (SharedTranspositionTable): Search results kept between
+                                                 parallel computer moves,
+                                                 created on first use
+        COMPUTER_MOVE_MS (int): Time the computer may think about a move
+        COMPUTER_MOVE_WORKERS (int): Processes the computer searches with;
+                                     more than one uses every core for a
+                                     single move
     """
+    COMPUTER_MOVE_MS = 1000
+    COMPUTER_MOVE_WORKERS = 1
+
     def __init__(self) -> None:
         """
         Creates the board, sets up the pieces, sets the color to white, and
         creates the prior stack
         """
-        self._board = self._setup_pieces()
-        self.current_player = Color.WHITE
-        self._prior_states = []
+        self._load(self._setup_pieces(), Color.WHITE)
+        self._init_tables()
 
     def reset(self) -> None:
         """
         Resets the game to the state it was initialized as
         """
-        self._board = self._setup_pieces()
-        self.current_player = Color.WHITE
+        self._load(self._setup_pieces(), Color.WHITE)
+        if self._accumulator is not None:
+            self._accumulator.refresh(self._board)
+        if self.shared_table is not None:
+            self.shared_table.close()
+        self._init_tables(self._accumulator)
+
+    def _init_tables(self, accumulator=None) -> None:
+        """
+        Starts the game's tables empty and attaches an accumulator
+        Parameters:
+            accumulator (Accumulator): accumulator built for the current
+                                       board, or None for no accumulator
+        """
+        self._accumulator = accumulator
+        self.transposition_table = None
+        self.pawn_table = PawnTable()
+        self.evaluation_cache = None
+        self.shared_table = None
+
+    def _load(self, board: list, player: Color, fullmove: int = 1) -> None:
+        """
+        Starts the game from a position, building everything that is kept
+        up to date from the board and clearing the prior stack
+        Parameters:
+            board (list): 2-d list of pieces belonging to this game
+            player (Color): player to move
+            fullmove (int): full move number of the position
+        """
+        self._board = board
+        self._bitboards = Bitboards(self._board)
+        self._king_squares = [lsb(self._bitboards.pieces[c][KING])
+                              for c in range(2)]
+        self.current_player = player
+        self._hash = hash_position(self._board, self.current_player)
+        self._score = score_board(self._board)
+        self._pawn_hash = pawn_hash(self._board)
         self._prior_states = []
+        self._first_move = fullmove
+        self._first_player = player
+
+    def copy(self) -> 'Game':
+        """
+        Creates a separate game with the current position, for searching
+        without touching this one. The copy has no prior stack and its
+        tables start empty; if a network accumulator is attached, the copy
+        gets its own accumulator for the same network
+        Returns:
+            (Game): the copy
+        """
+        game = Game.__new__(Game)
+        board = [[None for _ in range(8)] for _ in range(8)]
+        for y in range(8):
+            for x in range(8):
+                if self._board[y][x] is not None:
+                    board[y][x] = self._board[y][x].copy()
+                    board[y][x]._game = game
+        game._load(board, self.current_player, self._fullmove())
+        accumulator = None
+        if self._accumulator is not None:
+            accumulator = type(self._accumulator)(self._accumulator.network,
+                                                  board)
+        game._init_tables(accumulator)
+        return game
+
+    @classmethod
+    def from_fen(cls, fen: str) -> 'Game':
+        """
+        Creates a game in the position a FEN string describes. Castling and
+        en passant are not part of this game's rules, so those fields are
+        read past, as is the halfmove clock. A pawn counts as moved unless it
+        stands on its starting rank, which is exact since pawns never move
+        back to it
+        Parameters:
+            fen (str): the position, like START_FEN
+        Returns:
+            (Game): game in the position, with no prior stack
+        """
+        fields = fen.split()
+        if len(fields) < 2 or fields[1] not in ('w', 'b'):
+            raise ValueError(f'bad FEN {fen!r}')
+        ranks = fields[0].split('/')
+        if len(ranks) != 8:
+            raise ValueError(f'FEN {fen!r} does not have 8 ranks')
+        game = cls.__new__(cls)
+        board = [[None for _ in range(8)] for _ in range(8)]
+        kings = {Color.WHITE: 0, Color.BLACK: 0}
+        for y, rank in enumerate(ranks):
+            x = 0
+            for letter in rank:
+                if letter.isdigit():
+                    x += int(letter)
+                    continue
+                if letter.upper() not in FEN_PIECES or x > 7:
+                    raise ValueError(f'bad rank {rank!r} in FEN {fen!r}')
+                color = Color.WHITE if letter.isupper() else Color.BLACK
+                piece = FEN_PIECES[letter.upper()](color)
+                piece._game = game
+                if type(piece) is Pawn:
+                    if y in (0, 7):
+                        raise ValueError(f'pawn on the last rank in FEN '
+                                         f'{fen!r}')
+                    piece.moved = y != (6 if color == Color.WHITE else 1)
+                elif type(piece) is King:
+                    kings[color] += 1
+                board[y][x] = piece
+                x += 1
+            if x != 8:
+                raise ValueError(f'bad rank {rank!r} in FEN {fen!r}')
+        if kings[Color.WHITE] != 1 or kings[Color.BLACK] != 1:
+            raise ValueError(f'FEN {fen!r} needs one king of each color')
+        fullmove = int(fields[5]) if len(fields) > 5 else 1
+        game._load(board, Color.WHITE if fields[1] == 'w' else Color.BLACK,
+                   fullmove)
+        game._init_tables()
+        return game
+
+    def to_fen(self) -> str:
+        """
+        Describes the current position as a FEN string. There are never
+        castling rights or an en passant square, and with no fifty move rule
+        the halfmove clock is always 0
+        Returns:
+            (str): the position
+        """
+        ranks = []
+        for row in self._board:
+            rank = ''
+            empty = 0
+            for piece in row:
+                if piece is None:
+                    empty += 1
+                    continue
+                if empty:
+                    rank += str(empty)
+                    empty = 0
+                letter = FEN_LETTERS[type(piece)]
+                if piece.color == Color.BLACK:
+                    letter = letter.lower()
+                rank += letter
+            if empty:
+                rank += str(empty)
+            ranks.append(rank)
+        player = 'w' if self.current_player == Color.WHITE else 'b'
+        return f'{"/".join(ranks)} {player} - - 0 {self._fullmove()}'
+
+    def _fullmove(self) -> int:
+        """
+        Gets the full move number of the current position, counting on from
+        the starting position by the moves on the prior stack
+        Returns:
+            (int): the full move number
+        """
+        plies = len(self._prior_states)
+        if self._first_player == Color.BLACK:
+            plies += 1
+        return self._first_move + plies // 2
 
     def _setup_pieces(self):
         """
@@ -151,6 +402,67 @@ class Game:
         except IndexError:
             return None
 
+    @property
+    def zobrist_key(self) -> int:
+        """
+        Getter for the Zobrist key of the current position
+        Returns:
+            (int): 64-bit key of the pieces, pawn moved states and player to
+                   move
+        """
+        return self._hash
+
+    @property
+    def score(self) -> int:
+        """
+        Getter for the material and piece-square score of the current
+        position
+        Returns:
+            (int): score in centipawns, positive when white is ahead
+        """
+        return self._score
+
+    @property
+    def pawn_key(self) -> int:
+        """
+        Getter for the pawn Zobrist key of the current position
+        Returns:
+            (int): 64-bit key of the pawns alone
+        """
+        return self._pawn_hash
+
+    @property
+    def pawn_structure(self):
+        """
+        Getter for the doubled, isolated and passed pawn terms of the
+        current position, from the pawn table when it has them
+        Returns:
+            (PawnEntry): pawn structure score, positive when white is
+                         better, and passed pawn bitboards
+        """
+        return self.pawn_table.get(self._pawn_hash,
+                                   [self._bitboards.pieces[0][PAWN],
+                                    self._bitboards.pieces[1][PAWN]])
+
+    @property
+    def accumulator(self):
+        """
+        Getter for the attached network accumulator
+        Returns:
+            (Accumulator): the accumulator, or None if none is attached
+        """
+        return self._accumulator
+
+    def attach_accumulator(self, accumulator) -> None:
+        """
+        Attaches a network accumulator (see nnue.py) that make_move and
+        unmake_move push and pop from then on
+        Parameters:
+            accumulator (Accumulator): accumulator built for the current
+                                       board, or None to detach it
+        """
+        self._accumulator = accumulator
+
     def switch_player(self) -> None:
         """
         Switches the current player
@@ -164,18 +476,19 @@ class Game:
         """
         Undoes the board twice (1 move from both pieces)
         Returns:
-            (bool): True upon completion
+            (bool): True upon completion, False if there was nothing to undo
         """
+        if not self._prior_states:
+            return False
         for _ in range(2):
-            previous_board = self._prior_states.pop()
-            self._board = previous_board
+            if self._prior_states:
+                self.unmake_move(self._prior_states.pop())
         return True
 
     def copy_board(self):
         """
-        Preforms a deepcopy of the board to put on the stack after moves
-        have been made
-        _copy (list): a deepcopy of the board after a move has been made
+        Preforms a deepcopy of the board
+        _copy (list): a deepcopy of the board
         """
         self._copy = [[None for _ in range(8)] for _ in range(8)]
         # Loops over the entire current board and copies each piece onto a
@@ -189,6 +502,140 @@ class Game:
 
         return self._copy
 
+    def make_move(self, y: int, x: int, y2: int, x2: int) -> UndoRecord:
+        """
+        Makes a move in place and switches the player, without checking if
+        the move leaves the mover in check. Pawns reaching the opposite side
+        of the board are promoted to a Queen
+        Parameters:
+            y (int): current piece y coordinate
+            x (int): current piece x coordinate
+            y2 (int): desired piece y coordinate
+            x2 (int): desired piece x coordinate
+        Returns:
+            (UndoRecord): record that unmake_move uses to take the move back
+        """
+        piece = self._board[y][x]
+        captured = self._board[y2][x2]
+        sq = y * 8 + x
+        sq2 = y2 * 8 + x2
+        # Takes the moving and captured pieces out of the key
+        key = self._hash ^ BLACK_TO_MOVE_KEY ^ piece_key(piece, sq)
+        score = self._score - square_score(piece, sq)
+        pawn_key = self._pawn_hash
+        if type(piece) is Pawn:
+            pawn_key ^= PIECE_KEYS[piece.color.value][PAWN][sq]
+        if captured is not None:
+            key ^= piece_key(captured, sq2)
+            score -= square_score(captured, sq2)
+            if type(captured) is Pawn:
+                pawn_key ^= PIECE_KEYS[captured.color.value][PAWN][sq2]
+
+        # Keeps the bitboards in step with the board
+        if captured is not None:
+            self._bitboards.remove(captured, sq2)
+        self._bitboards.move(piece, sq, sq2)
+        self._board[y2][x2] = piece
+        self._board[y][x] = None
+
+        # Keeps the king squares in step with the board
+        if type(piece) is King:
+            self._king_squares[piece.color.value] = sq2
+        elif type(captured) is King:
+            self._king_squares[captured.color.value] = None
+
+        moved = None
+        promoted = None
+        if isinstance(piece, Pawn):
+            # Have to keep track if a pawn has moved at least once
+            moved = piece.moved
+            piece.moved = True
+            # Promote to Queen if pawn reaches opposite side of board
+            if (piece.color == Color.WHITE and y2 == 0) or \
+                    (piece.color == Color.BLACK and y2 == 7):
+                promoted = Queen(piece.color)
+                promoted._game = self
+                self._bitboards.remove(piece, sq2)
+                self._bitboards.add(promoted, sq2)
+                self._board[y2][x2] = promoted
+
+        # Puts whatever now stands on the desired square back into the key
+        # and the score
+        record = UndoRecord(piece, y, x, y2, x2, captured, moved, promoted,
+                            self._hash, self._score, self._pawn_hash)
+        self._hash = key ^ piece_key(self._board[y2][x2], sq2)
+        self._score = score + square_score(self._board[y2][x2], sq2)
+        if type(self._board[y2][x2]) is Pawn:
+            pawn_key ^= PIECE_KEYS[piece.color.value][PAWN][sq2]
+        self._pawn_hash = pawn_key
+        if self._accumulator is not None:
+            removed = ((piece, sq),) if captured is None else \
+                ((piece, sq), (captured, sq2))
+            self._accumulator.push(removed, ((self._board[y2][x2], sq2),))
+        self.switch_player()
+        return record
+
+    def unmake_move(self, record: UndoRecord) -> None:
+        """
+        Takes back a move made by make_move, restoring the captured piece,
+        the pawn moved flag and the current player
+        Parameters:
+            record (UndoRecord): record returned by make_move
+        """
+        piece = record.piece
+        sq = record.y * 8 + record.x
+        sq2 = record.y2 * 8 + record.x2
+
+        if record.promoted is not None:
+            self._bitboards.remove(record.promoted, sq2)
+            self._bitboards.add(piece, sq2)
+        self._bitboards.move(piece, sq2, sq)
+        if record.captured is not None:
+            self._bitboards.add(record.captured, sq2)
+        self._board[record.y][record.x] = piece
+        self._board[record.y2][record.x2] = record.captured
+
+        if type(piece) is King:
+            self._king_squares[piece.color.value] = sq
+        elif type(record.captured) is King:
+            self._king_squares[record.captured.color.value] = sq2
+
+        if record.moved is not None:
+            piece.moved = record.moved
+        self._hash = record.hash
+        self._score = record.score
+        self._pawn_hash = record.pawn_hash
+        if self._accumulator is not None:
+            self._accumulator.pop()
+        self.switch_player()
+
+    def make_null_move(self) -> None:
+        """
+        Passes the turn without moving a piece, for null-move pruning. Taken
+        back by unmake_null_move
+        """
+        self._hash ^= BLACK_TO_MOVE_KEY
+        self.switch_player()
+
+    def unmake_null_move(self) -> None:
+        """
+        Takes back a null move made by make_null_move
+        """
+        self._hash ^= BLACK_TO_MOVE_KEY
+        self.switch_player()
+
+    def has_non_pawn_material(self, color: Color) -> bool:
+        """
+        Checks if a player has any piece besides the king and pawns
+        Parameters:
+            color (Color): color of the player
+        Returns:
+            (bool): True if the player has a knight, bishop, rook or queen
+        """
+        pieces = self._bitboards.pieces[color.value]
+        return bool(pieces[KNIGHT] | pieces[BISHOP] | pieces[ROOK] |
+                    pieces[QUEEN])
+
     def move(self, piece: Piece, y: int, x: int, y2: int, x2: int) -> bool:
         """
         This function will move a designated piece to a new specific location
@@ -204,32 +651,13 @@ class Game:
             (bool) - True if the move did not put the user in check, otherwise
                      False
         """
-        self._prior_states.append(self.copy_board())
-
-        self._board[y2][x2] = self._board[y][x]
-        self._board[y][x] = None
-        # Have to keep track if a pawn has moved at least once
-        if isinstance(piece, Pawn):
-            piece.moved = True
+        record = self.make_move(y, x, y2, x2)
         # If the move put you in check, undo it and return False
         if self.check(piece.color):
-            previous_board = self._prior_states.pop()
-            self._board = previous_board
+            self.unmake_move(record)
             return False
 
-        # Promote to Queen if pawn reaches opposite side of board
-        if isinstance(piece, Pawn) and piece.color == Color.WHITE:
-            for i in range(8):
-                if self._board[0][i] == piece:
-                    self._board[0][i] = Queen(Color.WHITE)
-                    self._board[0][i]._game = self
-        if isinstance(piece, Pawn) and piece.color == Color.BLACK:
-            for i in range(8):
-                if self._board[7][i] == piece:
-                    self._board[7][i] = Queen(Color.BLACK)
-                    self._board[7][i]._game = self
-
-        self.switch_player()
+        self._prior_states.append(record)
         return True
 
     def get_piece_locations(self, color: Color) -> list[tuple[int, int]]:
@@ -241,13 +669,9 @@ class Game:
             piece_locations (list): list of tuples holding the piece locations
                                     from the passed in color
         """
-        piece_locations = []
-        for i in range(len(self._board)):
-            for j in range(len(self._board)):
-                if self._board[i][j] is not None:
-                    if self._board[i][j].color == color:
-                        piece_locations.append((i, j))
-        return piece_locations
+        # Walks the set squares of the color's occupancy bitboard
+        occupancy = self._bitboards.occupancy[color.value]
+        return [SQUARES[sq] for sq in iter_squares(occupancy)]
 
     def find_king(self, color: Color) -> tuple[int, int]:
         """
@@ -257,11 +681,10 @@ class Game:
         Returns:
             (tuple): king coordinated in form of tuple
         """
-        for i in range(len(self._board)):
-            for j in range(len(self._board)):
-                if isinstance(self._board[i][j], King):
-                    if self._board[i][j].color == color:
-                        return (i, j)
+        king = self._king_squares[color.value]
+        if king is None:
+            return None
+        return SQUARES[king]
 
     def check(self, color: Color) -> bool:
         """
@@ -271,28 +694,293 @@ class Game:
         Returns:
             (bool): True if king in check, otherwise False
         """
-        # Gets piece locations from passed in color
-        valid_moves = []
-        # Locations are a list of tuples
+        # The king is in check if the other color attacks its square
         if color == Color.WHITE:
-            piece_locations = self.get_piece_locations(Color.BLACK)
+            attacker_color = Color.BLACK
         else:
-            piece_locations = self.get_piece_locations(Color.WHITE)
+            attacker_color = Color.WHITE
+        king = self._king_squares[color.value]
+        if king is None:
+            return False
+        return self._bitboards.is_attacked(king, attacker_color)
 
-        # Gets the valid moves for the passed in colors pieces
-        for i in piece_locations:
-            # "i" is the first tuple
-            valid_moves += self._board[i[0]][i[1]].valid_moves(i[0], i[1])
+    def is_square_attacked(self, square: tuple[int, int],
+                           by_color: Color) -> bool:
+        """
+        Checks to see if any piece of a color attacks a square
+        Parameters:
+            square (tuple): (y, x) coordinate of the square
+            by_color (Color): color of the attacking pieces
+        Returns:
+            (bool): True if the square is attacked, otherwise False
+        """
+        return self._bitboards.is_attacked(square[0] * 8 + square[1],
+                                           by_color)
 
-        # If the king of one color is in the valid moves of the other color
-        # then they are in check
-        if color == Color.WHITE:
-            if self.find_king(Color.WHITE) in valid_moves:
-                return True
-        if color == Color.BLACK:
-            if self.find_king(Color.BLACK) in valid_moves:
-                return True
-        return False
+    def legal_moves(self, color: Color, tactical: Optional[bool] = None) \
+            -> Iterator[tuple[int, int, int, int]]:
+        """
+        Generates every legal move for a color without trying any of them.
+        The pieces checking the king and the pieces pinned to it are worked
+        out once up front, so every move yielded is legal. Callers that only
+        need to know if there is a legal move can stop after the first one
+        Parameters:
+            color (Color): color to generate moves for
+            tactical (bool): None for every move, True for captures and
+                             promotions only, False for every other move
+        Yields:
+            (tuple): move as (y, x, y2, x2)
+        """
+        bitboards = self._bitboards
+        c = color.value
+        own = bitboards.occupancy[c]
+        enemy = bitboards.occupancy[1 - c]
+        occupied = bitboards.occupied
+        pieces = bitboards.pieces[c]
+        king = self._king_squares[c]
+        attacker_color = Color.BLACK if c == 0 else Color.WHITE
+
+        # Not in check, any square not holding one of our pieces will do,
+        # narrowed down to captures or to empty squares if asked. Pawns also
+        # count pushes onto the last rank as tactical
+        if tactical is None:
+            targets = FULL & ~own
+            pawn_targets = targets
+        elif tactical:
+            targets = enemy
+            pawn_targets = enemy | PROMOTION_SQUARES[c]
+        else:
+            targets = FULL & ~occupied
+            pawn_targets = targets & ~PROMOTION_SQUARES[c]
+
+        pins = {}
+        if king is not None:
+            # Positions in check get their own, much smaller, generator
+            checkers = bitboards.attackers(king, attacker_color, occupied)
+            if checkers:
+                for move in self._evasions(color, king, checkers):
+                    if tactical is None or \
+                            self.is_tactical(move) == tactical:
+                        yield move
+                return
+            pins = bitboards.pins(king, color)
+            yield from self._king_moves(color, king, targets)
+
+        # Pinned knights can never stay on the pin line
+        for sq in iter_squares(pieces[KNIGHT]):
+            if sq not in pins:
+                for sq2 in iter_squares(KNIGHT_ATTACKS[sq] & targets):
+                    yield SQUARES[sq] + SQUARES[sq2]
+
+        for kind, attacks in ((BISHOP, bishop_attacks), (ROOK, rook_attacks),
+                              (QUEEN, queen_attacks)):
+            for sq in iter_squares(pieces[kind]):
+                moves = attacks(sq, occupied) & targets
+                if sq in pins:
+                    moves &= pins[sq]
+                for sq2 in iter_squares(moves):
+                    yield SQUARES[sq] + SQUARES[sq2]
+
+        for sq in iter_squares(pieces[PAWN]):
+            moves = PAWN_ATTACKS[c][sq] & enemy
+            # Pushes stop at the first occupied square, and only a pawn
+            # that has not moved may push two spaces
+            y, x = SQUARES[sq]
+            for sq2 in PAWN_PUSH_SQUARES[c][sq]:
+                if BITS[sq2] & occupied:
+                    break
+                moves |= BITS[sq2]
+                if self._board[y][x].moved:
+                    break
+            moves &= pawn_targets
+            if sq in pins:
+                moves &= pins[sq]
+            for sq2 in iter_squares(moves):
+                yield (y, x) + SQUARES[sq2]
+
+    def is_tactical(self, move: tuple[int, int, int, int]) -> bool:
+        """
+        Checks to see if a move captures a piece or promotes a pawn
+        Parameters:
+            move (tuple): move as (y, x, y2, x2)
+        Returns:
+            (bool): True for captures and promotions, otherwise False
+        """
+        y, x, y2, x2 = move
+        if self._board[y2][x2] is not None:
+            return True
+        return type(self._board[y][x]) is Pawn and (y2 == 0 or y2 == 7)
+
+    def see(self, move: tuple[int, int, int, int]) -> int:
+        """
+        Static exchange evaluation: plays out the captures on the move's
+        target square, each side always taking back with its least valuable
+        attacker and free to stop when taking back would lose material.
+        Sliders lined up behind an attacker join in once it has captured.
+        Pins are not considered
+        Parameters:
+            move (tuple): move as (y, x, y2, x2)
+        Returns:
+            (int): material won (or lost, if negative) in centipawns by the
+                   side making the move
+        """
+        y, x, y2, x2 = move
+        bitboards = self._bitboards
+        sq = y * 8 + x
+        sq2 = y2 * 8 + x2
+        promotes = BITS[sq2] & (PROMOTION_SQUARES[0] | PROMOTION_SQUARES[1])
+        promotion_gain = PIECE_VALUES[QUEEN] - PIECE_VALUES[PAWN]
+        white, black = bitboards.pieces
+        diagonal = white[BISHOP] | white[QUEEN] | black[BISHOP] | black[QUEEN]
+        orthogonal = white[ROOK] | white[QUEEN] | black[ROOK] | black[QUEEN]
+
+        # gains[i] is what the side making the i-th capture is up if the
+        # exchange stops right after it
+        target = self._board[y2][x2]
+        gains = [0]
+        if target is not None:
+            gains[0] = PIECE_VALUES[KIND_INDEX[type(target)]]
+        kind = KIND_INDEX[type(self._board[y][x])]
+        on_square = PIECE_VALUES[kind]
+        if kind == PAWN and promotes:
+            gains[0] += promotion_gain
+            on_square = PIECE_VALUES[QUEEN]
+
+        occupied = bitboards.occupied ^ BITS[sq]
+        attackers = (bitboards.attackers(sq2, Color.WHITE, occupied)
+                     | bitboards.attackers(sq2, Color.BLACK, occupied)) \
+            & occupied
+        side = 1 - self._board[y][x].color.value
+        while True:
+            side_attackers = attackers & bitboards.occupancy[side]
+            if not side_attackers:
+                break
+            for kind in range(6):
+                least = side_attackers & bitboards.pieces[side][kind]
+                if least:
+                    break
+            # A king can not take back onto a square that is still defended
+            if kind == KING and attackers & bitboards.occupancy[1 - side]:
+                break
+            gains.append(on_square - gains[-1])
+            on_square = PIECE_VALUES[kind]
+            if kind == PAWN and promotes:
+                gains[-1] += promotion_gain
+                on_square = PIECE_VALUES[QUEEN]
+
+            occupied ^= least & -least
+            # Sliders behind the piece that just captured can now see the
+            # square
+            attackers = (attackers
+                         | (bishop_attacks(sq2, occupied) & diagonal)
+                         | (rook_attacks(sq2, occupied) & orthogonal)) \
+                & occupied
+            side = 1 - side
+
+        # Each side only makes its capture if it does better than stopping
+        for i in range(len(gains) - 1, 0, -1):
+            gains[i - 1] = -max(-gains[i - 1], gains[i])
+        return gains[0]
+
+    def is_legal(self, move: tuple[int, int, int, int]) -> bool:
+        """
+        Checks to see if a move, such as one remembered from another
+        position, is legal for the current player
+        Parameters:
+            move (tuple): move as (y, x, y2, x2)
+        Returns:
+            (bool): True if the move is legal, otherwise False
+        """
+        y, x, y2, x2 = move
+        piece = self._board[y][x]
+        if piece is None or piece.color != self.current_player:
+            return False
+        if (y2, x2) not in piece.valid_moves(y, x):
+            return False
+        record = self.make_move(y, x, y2, x2)
+        legal = not self.check(piece.color)
+        self.unmake_move(record)
+        return legal
+
+    def _king_moves(self, color: Color, king: int,
+                    targets: int = FULL) -> Iterator[tuple[int, int, int, int]]:
+        """
+        Generates the legal king moves for a color
+        Parameters:
+            color (Color): color of the king
+            king (int): square index of the king
+            targets (int): bitboard of squares the king may move to
+        Yields:
+            (tuple): move as (y, x, y2, x2)
+        """
+        bitboards = self._bitboards
+        attacker_color = Color.BLACK if color == Color.WHITE else Color.WHITE
+        # The king may not step onto an attacked square, including one behind
+        # it on the line of a checking slider
+        without_king = bitboards.occupied ^ BITS[king]
+        for sq2 in iter_squares(KING_ATTACKS[king] & targets
+                                & ~bitboards.occupancy[color.value]):
+            if not bitboards.is_attacked(sq2, attacker_color, without_king):
+                yield SQUARES[king] + SQUARES[sq2]
+
+    def _evasions(self, color: Color, king: int,
+                  checkers: int) -> Iterator[tuple[int, int, int, int]]:
+        """
+        Generates the legal moves for a color that is in check: king escapes,
+        captures of the checking piece and blocks on the line between the
+        checking piece and the king. In double check only the king can move
+        Parameters:
+            color (Color): color that is in check
+            king (int): square index of the king
+            checkers (int): bitboard of the pieces giving check
+        Yields:
+            (tuple): move as (y, x, y2, x2)
+        """
+        yield from self._king_moves(color, king)
+        if checkers & (checkers - 1):
+            return
+
+        bitboards = self._bitboards
+        c = color.value
+        pieces = bitboards.pieces[c]
+        occupied = bitboards.occupied
+        checker = lsb(checkers)
+        # A pinned piece can never get the king out of check, since moving
+        # along its pin line neither takes nor blocks a different checker
+        pinned = 0
+        for sq in bitboards.pins(king, color):
+            pinned |= BITS[sq]
+        movers = bitboards.occupancy[c] & ~pieces[KING] & ~pinned
+
+        # Captures of the checking piece
+        for sq in iter_squares(bitboards.attackers(checker, color, occupied)
+                               & movers):
+            yield SQUARES[sq] + SQUARES[checker]
+
+        # Blocks on the squares between a checking slider and the king
+        blockers = (pieces[KNIGHT] | pieces[BISHOP] | pieces[ROOK]
+                    | pieces[QUEEN]) & movers
+        pawns = pieces[PAWN] & movers
+        step = -8 if color == Color.WHITE else 8
+        for sq2 in iter_squares(BETWEEN[king][checker]):
+            for sq in iter_squares(
+                    ((KNIGHT_ATTACKS[sq2] & pieces[KNIGHT])
+                     | (bishop_attacks(sq2, occupied)
+                        & (pieces[BISHOP] | pieces[QUEEN]))
+                     | (rook_attacks(sq2, occupied)
+                        & (pieces[ROOK] | pieces[QUEEN]))) & blockers):
+                yield SQUARES[sq] + SQUARES[sq2]
+            # Pawns block by pushing one space, or two if they have not moved
+            # and the space they pass over is empty
+            sq = sq2 - step
+            if 0 <= sq < 64:
+                if BITS[sq] & pawns:
+                    yield SQUARES[sq] + SQUARES[sq2]
+                elif not BITS[sq] & occupied and 0 <= sq - step < 64 and \
+                        BITS[sq - step] & pawns:
+                    y, x = SQUARES[sq - step]
+                    if not self._board[y][x].moved:
+                        yield (y, x) + SQUARES[sq2]
 
     def mate(self, color) -> bool:
         """
@@ -302,271 +990,61 @@ class Game:
         Returns:
             (bool): True if king in checkmate, otherwise False
         """
-        if color == Color.BLACK:
-            attacker_color = Color.WHITE
-        else:
-            attacker_color = Color.BLACK
-
         # if the king is not in check then it is not in checkmate
         if not self.check(color):
             return False
 
-        # Gets the kings space tuple
-        king_space = self.find_king(color)
-        # Gets king object
-        king = self._board[king_space[0]][king_space[1]]
-        # Gets valid moves for the king
-        king_moves = king.valid_moves(king_space[0], king_space[1])
-
-        # Gets a list of the attackers valid moves
-        attacker_moves = []
-        attacker_pieces = self.get_piece_locations(attacker_color)
-        for i in attacker_pieces:
-            attacker_moves += self.get(i[0], i[1]).valid_moves(i[0], i[1])
-
-        # Checks to see if there is a defending queen move that isn't in the
-        # list of attacker moves
-        for j in king_moves:
-            if j not in attacker_moves:
-                # If the king has a valid move, try it to ensure that it will
-                # not put you in check
-                if self.move(king, king_space[0], king_space[1], j[0], j[1]):
-                    # Code gets here it the move worked, it undoes the move
-                    # and returns false beacause the king is not in checkmate
-                    previous_board = self._prior_states.pop()
-                    self._board = previous_board
-                    self.current_player = Color.WHITE
-                    return False
-
-        # My checkmate function gets here if there are no valid king moves
-        # Gets a list of defender moves
-        defender_moves = []
-        defender_pieces = self.get_piece_locations(color)
-        for r in defender_pieces:
-            defender_moves += self.get(r[0], r[1]).valid_moves(r[0], r[1])
-
-        # Goes through all the defender pieces
-        for k in defender_pieces:
-            # Gets a specific piece object
-            piece = self.get(k[0], k[1])
-            piece_moves = piece.valid_moves(k[0], k[1])
-            # Loops through that pieces valid moves
-            for m in piece_moves:
-                # Checks to see if the move is valid via move function
-                if self.move(piece, k[0], k[1], m[0], m[1]):
-                    # This means the move is valid so it undoes the move; False
-                    previous_board = self._prior_states.pop()
-                    self._board = previous_board
-                    self.current_player = Color.WHITE
-                    return False
+        # Any legal move gets the king out of check, so stop at the first
+        for _ in self.legal_moves(color):
+            return False
         return True
 
+    def best_move(self, depth: int = DEFAULT_DEPTH,
+                  evaluate: Optional[Callable] = None,
+                  time_ms: Optional[int] = None,
+                  max_nodes: Optional[int] = None,
+                  workers: int = 1) -> Optional[tuple]:
+        """
+        Searches for the best move of the current player, deepening one ply
+        at a time until depth is reached or the budget runs out
+        Parameters:
+            depth (int): number of moves (plies) to look ahead
+            evaluate (callable): evaluation function for the engine; material,
+                                 piece-square tables and pawn structure if
+                                 not given
+            time_ms (int): wall-clock budget in milliseconds, no limit if not
+                           given
+            max_nodes (int): node budget, no limit if not given
+            workers (int): processes to search with in parallel
+        Returns:
+            (tuple): best move as (y, x, y2, x2), None if there is no legal
+                     move
+        """
+        if workers > 1:
+            if self.shared_table is None:
+                self.shared_table = SharedTranspositionTable()
+            return parallel_search(self, workers, depth, time_ms, max_nodes,
+                                   self.shared_table, evaluate).move
+        if self.transposition_table is None:
+            self.transposition_table = TranspositionTable()
+        # The cached scores are those of the default evaluation
+        cache = None
+        if evaluate is None:
+            if self.evaluation_cache is None:
+                self.evaluation_cache = EvaluationCache()
+            cache = self.evaluation_cache
+        engine = Engine(self, evaluate, self.transposition_table, cache)
+        move, _ = engine.search(depth, time_ms, max_nodes)
+        return move
+
     def _computer_move(self) -> None:
         """
-        AI that plays chess as the black pieces, it plays moves based on
-        priority of the piece in this order: checkmate, check, queen, bishop,
-        knight, rook, pawn, random
-        """
-        # Gets a list of moves for the AI
-        black_moves = []
-        b_piece_locations = self.get_piece_locations(Color.BLACK)
-        for sp in b_piece_locations:
-            black_moves += self._board[sp[0]][sp[1]].valid_moves(sp[0], sp[1])
-        # Gets a list of pieces for its opponent
-        w_piece_locations = self.get_piece_locations(Color.WHITE)
-
-        # Going to go through all the black piece locations, tuple by tuple
-        for black_tuple in b_piece_locations:
-            # Gets an object of a piece
-            current_piece = self._board[black_tuple[0]][black_tuple[1]]
-            # Gets a tuple that holds that pieces moves
-            its_moves = current_piece.valid_moves(black_tuple[0], black_tuple[1])
-            # Going to go through each of the current pieces moves
-            for j in its_moves:
-                # If the move returns True it worked; and the move has been made
-                if self.move(current_piece, black_tuple[0], black_tuple[1], j[0], j[1]):
-                    # If this move results in white being put in check then return
-                    if self.mate(Color.WHITE):
-                        return
-                    # If this move results in white not being put in check; undo the move
-                    # and continue from the previous state of the board
-                    else:
-                        previous_board = self._prior_states.pop()
-                        self._board = previous_board
-                        self.current_player = Color.BLACK
-
-        # Going to go through all the black piece locations, tuple by tuple
-        for black_tuple in b_piece_locations:
-            # Gets an object of a piece
-            current_piece = self._board[black_tuple[0]][black_tuple[1]]
-            # Gets a tuple that holds that pieces moves
-            its_moves = current_piece.valid_moves(black_tuple[0], black_tuple[1])
-            # Going to go through each of the current pieces moves
-            for j in its_moves:
-                # If the move returns True it worked; and the move has been made
-                if self.move(current_piece, black_tuple[0], black_tuple[1], j[0], j[1]):
-                    # If this move results in white being put in check then return
-                    if self.check(Color.WHITE):
-                        return
-                    # If this move results in white not being put in check; undo the move
-                    # and continue from the previous state of the board
-                    else:
-                        previous_board = self._prior_states.pop()
-                        self._board = previous_board
-                        self.current_player = Color.BLACK
-
-        # Checks to see if the AI can take a queen
-        queen_exists = False
-        # Checks if any of the user pieces are a queen object
-        for piece_tuple in w_piece_locations:
-            if isinstance(self.get(piece_tuple[0], piece_tuple[1]), Queen):
-                queen_location = (piece_tuple[0], piece_tuple[1])
-                queen_exists = True
-        # If the user has a queen object then it checks to see if its
-        # coordinates are in the list of black moves
-        if queen_exists:
-            if queen_location in black_moves:
-                # Looks for the piece who has the queens space as a valid move
-                for black_tuple in b_piece_locations:
-                    piece = self._board[black_tuple[0]][black_tuple[1]]
-                    # Get a list of tuples of available moves for a certain piece
-                    available_moves = piece.valid_moves(black_tuple[0], black_tuple[1])
-                    # Loops through each move of the current piece checking if
-                    # a queen is located there
-                    for i in available_moves:
-                        if isinstance(self.get(i[0], i[1]), Queen):
-                            # If the move is the space as the queen, make that move
-                            if self.move(piece, black_tuple[0], black_tuple[1], i[0], i[1]):
-                                return
-                            else:
-                                self.current_player = Color.BLACK
-
-        # Checks to see if AI can take a bishop
-        bishop_exists = False
-        # Checks if any of the user pieces are a bishop object
-        for piece_tuple in w_piece_locations:
-            if isinstance(self.get(piece_tuple[0], piece_tuple[1]), Bishop):
-                bishop_location = (piece_tuple[0], piece_tuple[1])
-                if bishop_location in black_moves:
-                    bishop_exists = True
-                    break
-        # If the user has a bishop object then it checks to see if its
-        # coordinates are in the list of black moves
-        if bishop_exists:
-            if bishop_location in black_moves:
-                # Looks for the piece who has the bishops space as a valid move
-                for black_tuple in b_piece_locations:
-                    piece = self._board[black_tuple[0]][black_tuple[1]]
-                    # Get a list of tuples of available moves for a certain piece
-                    available_moves = piece.valid_moves(black_tuple[0], black_tuple[1])
-                    # Loops through each move of the current piece checking if
-                    # a bishop is located there
-                    for i in available_moves:
-                        if isinstance(self.get(i[0], i[1]), Bishop):
-                            # If the move is the space as the bishop, make that move
-                            if self.move(piece, black_tuple[0], black_tuple[1], i[0], i[1]):
-                                return
-                            else:
-                                self.current_player = Color.BLACK
-
-        # Checks to see if AI can take a knight
-        knight_exists = False
-        # Checks if any of the user pieces are a knight object
-        for piece_tuple in w_piece_locations:
-            if isinstance(self.get(piece_tuple[0], piece_tuple[1]), Knight):
-                knight_location = (piece_tuple[0], piece_tuple[1])
-                if knight_location in black_moves:
-                    knight_exists = True
-                    break
-        # If the user has a knight object then it checks to see if its
-        # coordinates are in the list of black moves
-        if knight_exists:
-            if knight_location in black_moves:
-                # Looks for the piece who has the knights space as a valid move
-                for black_tuple in b_piece_locations:
-                    piece = self._board[black_tuple[0]][black_tuple[1]]
-                    # Get a list of tuples of available moves for a certain piece
-                    available_moves = piece.valid_moves(black_tuple[0], black_tuple[1])
-                    # Loops through each move of the current piece checking if
-                    # a knight is located there
-                    for i in available_moves:
-                        if isinstance(self.get(i[0], i[1]), Knight):
-                            # If the move is the space as the knight, make that move
-                            if self.move(piece, black_tuple[0], black_tuple[1], i[0], i[1]):
-                                return
-                            else:
-                                self.current_player = Color.BLACK
-
-        # Checks to see if AI can take a rook
-        rook_exists = False
-        # Checks if any of the user pieces are a rook object
-        for piece_tuple in w_piece_locations:
-            if isinstance(self.get(piece_tuple[0], piece_tuple[1]), Rook):
-                rook_location = (piece_tuple[0], piece_tuple[1])
-                if rook_location in black_moves:
-                    rook_exists = True
-                    break
-        # If the user has a rook object then it checks to see if its
-        # coordinates are in the list of black moves
-        if rook_exists:
-            if rook_location in black_moves:
-                # Looks for the piece who has the rooks space as a valid move
-                for black_tuple in b_piece_locations:
-                    piece = self._board[black_tuple[0]][black_tuple[1]]
-                    # Get a list of tuples of available moves for a certain piece
-                    available_moves = piece.valid_moves(black_tuple[0], black_tuple[1])
-                    # Loops through each move of the current piece checking if
-                    # a rook is located there
-                    for i in available_moves:
-                        if isinstance(self.get(i[0], i[1]), Rook):
-                            # If the move is the space as the rook, make that move
-                            if self.move(piece, black_tuple[0], black_tuple[1], i[0], i[1]):
-                                return
-                            else:
-                                self.current_player = Color.BLACK
-
-        # Checks to see if AI can take a pawn
-        pawn_exists = False
-        # Checks if any of the user pieces are a pawn object
-        for piece_tuple in w_piece_locations:
-            if isinstance(self.get(piece_tuple[0], piece_tuple[1]), Pawn):
-                pawn_location = (piece_tuple[0], piece_tuple[1])
-                if pawn_location in black_moves:
-                    pawn_exists = True
-                    break
-        # If the user has a pawn object then it checks to see if its
-        # coordinates are in the list of black moves
-        if pawn_exists:
-            if pawn_location in black_moves:
-                # Looks for the piece who has the pawns space as a valid move
-                for black_tuple in b_piece_locations:
-                    piece = self._board[black_tuple[0]][black_tuple[1]]
-                    # Get a list of tuples of available moves for a certain piece
-                    available_moves = piece.valid_moves(black_tuple[0], black_tuple[1])
-                    # Loops through each move of the current piece checking if
-                    # a pawn is located there
-                    for i in available_moves:
-                        if isinstance(self.get(i[0], i[1]), Pawn):
-                            # If the move is the space as the pawn, make that move
-                            if self.move(piece, black_tuple[0], black_tuple[1], i[0], i[1]):
-                                return
-                            else:
-                                self.current_player = Color.BLACK
-
-        # This generates a random move for the AI
-        # Gets a list of tuples of all the black pieces
-        pieces = self.get_piece_locations(Color.BLACK)
-        # While there are still piece tuples in the list
-        while pieces:
-            # Gets a tuple for a specific piece
-            piece_tuple = random.choice(pieces)
-            # Gets the piece object
-            piece = self.get(piece_tuple[0], piece_tuple[1])
-            # Get the pieces move
-            piece_moves = piece.valid_moves(piece_tuple[0], piece_tuple[1])
-            if piece_moves:
-                for m in piece_moves:
-                    # If the move worked then that is the chosen move
-                    if self.move(piece, piece_tuple[0], piece_tuple[1], m[0], m[1]):
-                        return
-            pieces.remove(piece_tuple)
+        AI that plays chess as the black pieces, it plays the move the search
+        engine finds best for the current position within COMPUTER_MOVE_MS,
+        searching with COMPUTER_MOVE_WORKERS processes
+        """
+        move = self.best_move(MAX_DEPTH, time_ms=self.COMPUTER_MOVE_MS,
+                              workers=self.COMPUTER_MOVE_WORKERS)
+        if move is not None:
+            y, x, y2, x2 = move
+            self.move(self._board[y][x], y, x, y2, x2)
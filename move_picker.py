@@ -0,0 +1,108 @@
+# Final Project - Chess - CIS 163
+# Prof. Ira Woodring
+# Created by Clay Beal
+# - in association with Zachary Bauer
+from typing import Iterator, Optional
+
+from bitboard import KIND_INDEX, PIECE_VALUES, PAWN, QUEEN
+
+# Extra value of a pawn promoting to a queen, for ordering promotions
+PROMOTION_GAIN = PIECE_VALUES[QUEEN] - PIECE_VALUES[PAWN]
+
+
+def mvv_lva(board: list, move: tuple[int, int, int, int]) -> int:
+    """
+    Scores a capture or promotion for ordering
+    Parameters:
+        board (list): 2-d list of pieces the move is played on
+        move (tuple): move as (y, x, y2, x2)
+    Returns:
+        (int): higher for more valuable victims and cheaper attackers
+    """
+    y, x, y2, x2 = move
+    attacker = KIND_INDEX[type(board[y][x])]
+    victim = board[y2][x2]
+    gain = 0 if victim is None else PIECE_VALUES[KIND_INDEX[type(victim)]]
+    # A pawn reaching the last rank becomes a queen
+    if attacker == PAWN and (y2 == 0 or y2 == 7):
+        gain += PROMOTION_GAIN
+    return gain * 8 - attacker
+
+
+class MovePicker:
+    """
+    Hands out the legal moves of the player to move one stage at a time, so
+    a search that cuts off early never generates or sorts the later stages:
+        1. the hash move from the transposition table
+        2. captures and promotions that do not lose material by static
+           exchange evaluation, most valuable victim first and least
+           valuable attacker first among equal victims (MVV-LVA)
+        3. killer moves, quiet moves that caused a cutoff at the same ply
+        4. the remaining quiet moves, highest history score first
+        5. captures and promotions that lose material
+    The game must not be changed between moves except by make_move and
+    unmake_move pairs, since later stages are generated from it
+    Attributes:
+        _game (Game): game whose moves are picked
+        _hash_move (tuple): move to try first, or None
+        _killers (tuple): killer moves for this ply
+        _history (dict): move -> history score for the player to move
+    """
+    def __init__(self, game, hash_move: Optional[tuple] = None,
+                 killers: tuple = (), history: Optional[dict] = None) -> None:
+        """
+        Creates a move picker for the current position of a game
+        Parameters:
+            game (Game): game to pick moves for
+            hash_move (tuple): best move stored for the position, or None
+            killers (tuple): killer moves for the ply of the position
+            history (dict): history scores of the player to move
+        """
+        self._game = game
+        self._hash_move = hash_move
+        self._killers = killers
+        self._history = history if history is not None else {}
+
+    def __iter__(self) -> Iterator[tuple[int, int, int, int]]:
+        """
+        Yields the moves in stage order, each legal move exactly once
+        """
+        game = self._game
+        color = game.current_player
+        hash_move = self._hash_move
+        # The hash move may come from another position with the same key
+        if hash_move is not None:
+            if game.is_legal(hash_move):
+                yield hash_move
+            else:
+                hash_move = None
+
+        captures = list(game.legal_moves(color, tactical=True))
+        board = game._board
+        captures.sort(key=lambda move: mvv_lva(board, move), reverse=True)
+        losing = []
+        for move in captures:
+            if move != hash_move:
+                if game.see(move) < 0:
+                    losing.append(move)
+                else:
+                    yield move
+
+        # Killers come from sibling positions, so they are checked on their
+        # own before any quiet move is generated
+        killers = []
+        for killer in self._killers:
+            if killer is not None and killer != hash_move and \
+                    killer not in killers and \
+                    not game.is_tactical(killer) and game.is_legal(killer):
+                killers.append(killer)
+                yield killer
+
+        quiets = list(game.legal_moves(color, tactical=False))
+        history = self._history
+        quiets.sort(key=lambda move: history.get(move, 0), reverse=True)
+        for move in quiets:
+            if move != hash_move and move not in killers:
+                yield move
+
+        yield from losing
@@ -0,0 +1,360 @@
+# Final Project - Chess - CIS 163
+# Prof. Ira Woodring
+# Created by Clay Beal
+# - in association with Zachary Bauer
+"""
+Optional learned evaluation: a small efficiently updatable neural network
+(NNUE) run on the CPU with NumPy.
+
+The first layer has one input per (perspective, piece color, kind, square)
+and its output, the accumulator, is kept for both sides. A move only adds and
+subtracts the weight columns of the few piece-squares it changes, so the
+accumulators follow make_move and unmake_move instead of being recomputed.
+
+Weights are read from a local .npz file holding:
+    w1 (int16, 768 x hidden): first layer weights
+    b1 (int16, hidden): first layer bias
+    w2 (int16, 2 * hidden): output weights, player to move's half first
+    b2 (int32, scalar): output bias
+
+Usage:
+    python nnue.py init weights.npz     writes random weights to try it with
+    python nnue.py bench weights.npz    compares it with the hand-written
+                                        evaluation
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+from piece_model import Color
+from bitboard import KIND_INDEX
+
+FEATURES = 2 * 6 * 64
+DEFAULT_HIDDEN = 128
+# Clipped ReLU ceiling of the accumulator and scale of the output weights
+QA = 255
+QB = 64
+# Centipawns per unit of network output
+SCALE = 400
+
+
+def feature_index(perspective: int, color: int, kind: int, sq: int) -> int:
+    """
+    Gets the input feature of a piece as seen by one side. Black sees the
+    board flipped, so both sides share the same weights
+    Parameters:
+        perspective (int): color value of the side looking at the board
+        color (int): color value of the piece
+        kind (int): kind index of the piece
+        sq (int): square index of the piece
+    Returns:
+        (int): feature index, 0 to FEATURES - 1
+    """
+    if perspective == Color.BLACK.value:
+        sq ^= 56
+    return ((color != perspective) * 6 + kind) * 64 + sq
+
+
+class Network:
+    """
+    Quantized network weights
+    Attributes:
+        hidden (int): accumulator size for one side
+        w1 (ndarray): first layer weights, FEATURES x hidden int16
+        b1 (ndarray): first layer bias, hidden int16
+        w2 (ndarray): output weights, 2 * hidden int32
+        b2 (int): output bias
+        columns (ndarray): columns[color][kind][sq] is the pair of first
+                           layer columns a piece adds to the white and
+                           black accumulators
+    """
+    def __init__(self, w1: np.ndarray, b1: np.ndarray, w2: np.ndarray,
+                 b2: int) -> None:
+        """
+        Creates a network from its weights
+        Parameters:
+            w1 (ndarray): first layer weights, FEATURES x hidden
+            b1 (ndarray): first layer bias
+            w2 (ndarray): output weights, 2 * hidden
+            b2 (int): output bias
+        """
+        if w1.shape[0] != FEATURES or b1.shape != (w1.shape[1],) or \
+                w2.shape != (2 * w1.shape[1],):
+            raise ValueError('weight shapes do not match')
+        self.hidden = w1.shape[1]
+        self.w1 = w1.astype(np.int16)
+        self.b1 = b1.astype(np.int16)
+        # The output layer sums in 32 bits so the products cannot overflow
+        self.w2 = w2.astype(np.int32)
+        self.b2 = int(b2)
+        index = np.array([[[[feature_index(p, c, k, sq) for p in range(2)]
+                            for sq in range(64)]
+                           for k in range(6)]
+                          for c in range(2)])
+        self.columns = self.w1[index]
+
+    @classmethod
+    def load(cls, path: str) -> 'Network':
+        """
+        Reads weights from a local .npz file
+        Parameters:
+            path (str): file to read
+        Returns:
+            (Network): the network
+        """
+        with np.load(path) as data:
+            return cls(data['w1'], data['b1'], data['w2'], int(data['b2']))
+
+    @classmethod
+    def random(cls, hidden: int = DEFAULT_HIDDEN, seed: int = 0) -> 'Network':
+        """
+        Creates a network with small random weights, for testing
+        Parameters:
+            hidden (int): accumulator size for one side
+            seed (int): random seed
+        Returns:
+            (Network): the network
+        """
+        rng = np.random.default_rng(seed)
+        w1 = rng.integers(-32, 33, (FEATURES, hidden), dtype=np.int16)
+        b1 = rng.integers(0, 64, hidden, dtype=np.int16)
+        w2 = rng.integers(-16, 17, 2 * hidden, dtype=np.int16)
+        return cls(w1, b1, w2, 0)
+
+    def save(self, path: str) -> None:
+        """
+        Writes the weights to a local .npz file
+        Parameters:
+            path (str): file to write
+        """
+        np.savez(path, w1=self.w1, b1=self.b1,
+                 w2=self.w2.astype(np.int16), b2=np.int32(self.b2))
+
+
+class Accumulator:
+    """
+    Stack of first layer outputs for both sides, one entry per move made on
+    the game it is attached to. Game.make_move pushes the changed
+    piece-squares and Game.unmake_move pops them again
+    Attributes:
+        network (Network): network whose first layer is accumulated
+        _stack (list): 2 x hidden int16 arrays, white's half first
+    """
+    def __init__(self, network: Network, board: list) -> None:
+        """
+        Creates an accumulator for a board
+        Parameters:
+            network (Network): network to evaluate with
+            board (list): 2-d list of pieces to start from
+        """
+        self.network = network
+        self._stack = []
+        self.refresh(board)
+
+    def refresh(self, board: list) -> None:
+        """
+        Computes the accumulator of a board from scratch, dropping the stack
+        Parameters:
+            board (list): 2-d list of pieces
+        """
+        network = self.network
+        values = np.tile(network.b1, (2, 1))
+        for y in range(8):
+            for x in range(8):
+                piece = board[y][x]
+                if piece is not None:
+                    values += network.columns[piece.color.value][
+                        KIND_INDEX[type(piece)]][y * 8 + x]
+        self._stack = [values]
+
+    def push(self, removed: tuple, added: tuple) -> None:
+        """
+        Pushes the accumulator of the position after a move
+        Parameters:
+            removed (tuple): (piece, square) pairs the move takes off
+            added (tuple): (piece, square) pairs the move puts on
+        """
+        columns = self.network.columns
+        values = self._stack[-1].copy()
+        for piece, sq in removed:
+            values -= columns[piece.color.value][KIND_INDEX[type(piece)]][sq]
+        for piece, sq in added:
+            values += columns[piece.color.value][KIND_INDEX[type(piece)]][sq]
+        self._stack.append(values)
+
+    def pop(self) -> None:
+        """
+        Goes back to the accumulator of the position before the last move
+        """
+        self._stack.pop()
+
+    def evaluate(self, color: Color) -> int:
+        """
+        Runs the rest of the network on the current accumulator
+        Parameters:
+            color (Color): player to move
+        Returns:
+            (int): score in centipawns for the player to move
+        """
+        network = self.network
+        values = self._stack[-1]
+        us = values[color.value]
+        them = values[1 - color.value]
+        hidden = network.hidden
+        output = network.b2 + \
+            int(np.dot(np.clip(us, 0, QA).astype(np.int32),
+                       network.w2[:hidden])) + \
+            int(np.dot(np.clip(them, 0, QA).astype(np.int32),
+                       network.w2[hidden:]))
+        return output * SCALE // (QA * QB)
+
+
+def nnue_evaluation(game) -> int:
+    """
+    Scores a position with the network of the accumulator attached to the
+    game by Game.attach_accumulator
+    Parameters:
+        game (Game): game to score
+    Returns:
+        (int): score in centipawns from the point of view of the player to
+               move
+    """
+    return game.accumulator.evaluate(game.current_player)
+
+
+def _positions(count: int, seed: int) -> list:
+    """
+    Plays random games to get positions to benchmark on
+    Parameters:
+        count (int): number of positions
+        seed (int): random seed
+    Returns:
+        (list): move lists, each leading from the start to a position
+    """
+    from game import Game
+    rng = random.Random(seed)
+    lines = []
+    while len(lines) < count:
+        game = Game()
+        line = []
+        for _ in range(rng.randrange(10, 60)):
+            moves = list(game.legal_moves(game.current_player))
+            if not moves:
+                break
+            move = rng.choice(moves)
+            game.make_move(*move)
+            line.append(move)
+        lines.append(line)
+    return lines
+
+
+def benchmark(network: Network, positions: int = 200, depth: int = 3,
+              seed: int = 0) -> dict:
+    """
+    Compares the network with the hand-written piece-square evaluation:
+    evaluations per second on the same positions, make and unmake pairs per
+    second with and without an accumulator attached, and nodes per second of
+    a fixed depth search with each evaluation
+    Parameters:
+        network (Network): network to benchmark
+        positions (int): number of random positions
+        depth (int): search depth
+        seed (int): random seed for the positions
+    Returns:
+        (dict): measurement name -> (hand-written, network) rates per second
+    """
+    from game import Game
+    from engine import Engine
+    from evaluation import piece_square_evaluation
+    lines = _positions(positions, seed)
+    results = {}
+
+    def timed(function) -> float:
+        start = time.perf_counter()
+        count = function()
+        return count / (time.perf_counter() - start)
+
+    def evaluations(evaluate, attach: bool) -> float:
+        def run() -> int:
+            count = 0
+            for line in lines:
+                game = Game()
+                if attach:
+                    game.attach_accumulator(Accumulator(network, game._board))
+                for move in line:
+                    game.make_move(*move)
+                for _ in range(100):
+                    evaluate(game)
+                count += 100
+            return count
+        return timed(run)
+
+    def make_unmake(attach: bool) -> float:
+        def run() -> int:
+            count = 0
+            for line in lines:
+                game = Game()
+                if attach:
+                    game.attach_accumulator(Accumulator(network, game._board))
+                for move in line:
+                    game.make_move(*move)
+                for move in game.legal_moves(game.current_player):
+                    game.unmake_move(game.make_move(*move))
+                    count += 1
+            return count
+        return timed(run)
+
+    def search(evaluate, attach: bool) -> float:
+        nodes = 0
+        start = time.perf_counter()
+        for line in lines[:20]:
+            game = Game()
+            if attach:
+                game.attach_accumulator(Accumulator(network, game._board))
+            for move in line:
+                game.make_move(*move)
+            engine = Engine(game, evaluate)
+            engine.search(depth)
+            nodes += engine.nodes + engine.qnodes
+        return nodes / (time.perf_counter() - start)
+
+    results['evaluations'] = (evaluations(piece_square_evaluation, False),
+                              evaluations(nnue_evaluation, True))
+    results['make/unmake'] = (make_unmake(False), make_unmake(True))
+    results['search nodes'] = (search(piece_square_evaluation, False),
+                               search(nnue_evaluation, True))
+    return results
+
+
+def main() -> None:
+    """
+    Command line entry point
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+    init = commands.add_parser('init', help='write random weights')
+    init.add_argument('weights')
+    init.add_argument('--hidden', type=int, default=DEFAULT_HIDDEN)
+    init.add_argument('--seed', type=int, default=0)
+    bench = commands.add_parser('bench', help='benchmark against the '
+                                              'hand-written evaluation')
+    bench.add_argument('weights')
+    bench.add_argument('--positions', type=int, default=200)
+    bench.add_argument('--depth', type=int, default=3)
+    args = parser.parse_args()
+
+    if args.command == 'init':
+        Network.random(args.hidden, args.seed).save(args.weights)
+        return
+    results = benchmark(Network.load(args.weights), args.positions,
+                        args.depth)
+    print(f'{"per second":<14}{"hand-written":>14}{"nnue":>14}{"ratio":>8}')
+    for name, (hand, network) in results.items():
+        print(f'{name:<14}{hand:>14,.0f}{network:>14,.0f}'
+              f'{network / hand:>8.2f}')
+
+
+if __name__ == '__main__':
+    main()
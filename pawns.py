@@ -0,0 +1,137 @@
+# Final Project - Chess - CIS 163
+# Prof. Ira Woodring
+# Created by Clay Beal
+# - in association with Zachary Bauer
+from typing import NamedTuple
+
+from piece_model import Color
+from bitboard import BITS, iter_squares
+
+DEFAULT_PAWN_ENTRIES = 4096
+
+# Penalties for each pawn on a file already holding a pawn of its color, and
+# for each pawn with no pawn of its color on a neighbouring file
+DOUBLED_PENALTY = 10
+ISOLATED_PENALTY = 15
+# Bonus for a passed pawn, indexed by how many rows it has advanced
+PASSED_BONUS = (0, 5, 10, 20, 35, 60, 100, 0)
+
+# FILES[x] is every square with that x coordinate
+FILES = [0x0101010101010101 << x for x in range(8)]
+# Files next to each file
+NEIGHBOUR_FILES = [(FILES[x - 1] if x > 0 else 0) |
+                   (FILES[x + 1] if x < 7 else 0) for x in range(8)]
+
+
+def _front_span(color: int, sq: int) -> int:
+    """
+    Builds the set of squares in front of a pawn on its own and the
+    neighbouring files, which must hold no enemy pawn for it to be passed
+    """
+    y, x = divmod(sq, 8)
+    files = FILES[x] | NEIGHBOUR_FILES[x]
+    if color == Color.WHITE.value:
+        rows = (1 << (y * 8)) - 1
+    else:
+        rows = ~((1 << ((y + 1) * 8)) - 1)
+    return files & rows
+
+
+# PASSED_SPANS[color value][square]
+PASSED_SPANS = [[_front_span(color, sq) for sq in range(64)]
+                for color in range(2)]
+
+
+class PawnEntry(NamedTuple):
+    """
+    Cached pawn structure of one position
+    Attributes:
+        key (int): pawn Zobrist key of the position
+        score (int): pawn structure score, positive when white is better
+        passed (tuple): passed pawn bitboards indexed by color value
+    """
+    key: int
+    score: int
+    passed: tuple[int, int]
+
+
+def evaluate_pawns(pawns: list) -> tuple[int, tuple[int, int]]:
+    """
+    Scores doubled, isolated and passed pawns from scratch
+    Parameters:
+        pawns (list): pawn bitboards indexed by color value
+    Returns:
+        (tuple): score, positive when white is better, and the passed pawn
+                 bitboards indexed by color value
+    """
+    score = 0
+    passed = [0, 0]
+    for color in range(2):
+        own = pawns[color]
+        enemy = pawns[1 - color]
+        sign = 1 if color == Color.WHITE.value else -1
+        for x in range(8):
+            count = (own & FILES[x]).bit_count()
+            if count:
+                score -= sign * DOUBLED_PENALTY * (count - 1)
+                if not own & NEIGHBOUR_FILES[x]:
+                    score -= sign * ISOLATED_PENALTY * count
+        for sq in iter_squares(own):
+            if not enemy & PASSED_SPANS[color][sq]:
+                passed[color] |= BITS[sq]
+                y = sq // 8
+                advanced = 7 - y if color == Color.WHITE.value else y
+                score += sign * PASSED_BONUS[advanced]
+    return score, (passed[0], passed[1])
+
+
+class PawnTable:
+    """
+    Fixed-size cache of pawn structure indexed by the low bits of the pawn
+    Zobrist key. Pawn structure only changes when a pawn moves, is captured
+    or promotes, so most positions a search reaches share an entry. Each
+    slot holds one entry and a new one always replaces it
+    Attributes:
+        size (int): number of slots, a power of two
+        hits (int): probes that found their pawn structure
+        probes (int): probes made
+    """
+    def __init__(self, entries: int = DEFAULT_PAWN_ENTRIES) -> None:
+        """
+        Creates an empty table
+        Parameters:
+            entries (int): slot cap; the table gets the largest power of two
+                           slots that fits
+        """
+        self.size = 1 << (max(1, entries).bit_length() - 1)
+        self._mask = self.size - 1
+        self._entries = [None] * self.size
+        self.hits = 0
+        self.probes = 0
+
+    def clear(self) -> None:
+        """
+        Empties the table
+        """
+        self._entries = [None] * self.size
+
+    def get(self, key: int, pawns: list) -> PawnEntry:
+        """
+        Gets the pawn structure of a position, computing and storing it if it
+        is not cached
+        Parameters:
+            key (int): pawn Zobrist key of the position
+            pawns (list): pawn bitboards indexed by color value
+        Returns:
+            (PawnEntry): the cached or new entry
+        """
+        self.probes += 1
+        index = key & self._mask
+        entry = self._entries[index]
+        if entry is not None and entry.key == key:
+            self.hits += 1
+            return entry
+        score, passed = evaluate_pawns(pawns)
+        entry = PawnEntry(key, score, passed)
+        self._entries[index] = entry
+        return entry
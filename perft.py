@@ -0,0 +1,133 @@
+# Final Project - Chess - CIS 163
+# Prof. Ira Woodring
+# Created by Clay Beal
+# - in association with Zachary Bauer
+"""
+Counts the positions move generation reaches to a fixed depth (perft) and
+checks them against known counts, as the benchmark and regression test for
+move generation.
+
+The rules are those of Game: no castling or en passant, pawns promote to a
+queen only, and a pawn may move two spaces while it has not moved.
+
+Usage:
+    python perft.py [--depth N] [--position NAME | --fen FEN] [--divide]
+"""
+import argparse
+import sys
+import time
+
+from game import Game, START_FEN, move_name
+
+# Reference positions in FEN, with the known node count at each depth
+# starting from 1
+POSITIONS = {
+    'start': (START_FEN, (20, 400, 8902, 197281)),
+    'italian': ('r1bqk1nr/pppp1ppp/2n5/2b1p3/2B1P3/5N2/PPPP1PPP/RNBQK2R '
+                'w - - 0 4', (32, 1114, 35216, 1202820)),
+    'scandinavian check': ('rnb1kbnr/ppp1pppp/8/4q3/8/2N5/PPPP1PPP/R1BQKBNR '
+                           'w - - 0 4', (5, 215, 5024, 204806)),
+    'promotion': ('r1bqkb1r/ppppP2p/2n4n/8/8/8/PPPPPPP1/RNBQKBNR w - - 0 5',
+                  (25, 531, 14676, 354016)),
+    'scholar': ('r1bqkb1r/pppp1ppp/2n2n2/4p2Q/2B1P3/8/PPPP1PPP/RNB1K1NR '
+                'w - - 0 4', (43, 1133, 45611, 1280683)),
+}
+DEFAULT_DEPTH = 3
+
+
+def perft(game: Game, depth: int) -> int:
+    """
+    Counts the move sequences of a given length from the current position.
+    At the last ply the legal moves are counted without being made
+    Parameters:
+        game (Game): game in the position to count from
+        depth (int): plies
+    Returns:
+        (int): number of leaf positions
+    """
+    if depth == 0:
+        return 1
+    moves = list(game.legal_moves(game.current_player))
+    if depth == 1:
+        return len(moves)
+    nodes = 0
+    for move in moves:
+        record = game.make_move(*move)
+        nodes += perft(game, depth - 1)
+        game.unmake_move(record)
+    return nodes
+
+
+def divide(game: Game, depth: int) -> dict:
+    """
+    Counts the leaf positions under each legal move, to narrow down where a
+    count goes wrong
+    Parameters:
+        game (Game): game in the position to count from
+        depth (int): plies, including the move itself
+    Returns:
+        (dict): move -> number of leaf positions under it
+    """
+    counts = {}
+    for move in list(game.legal_moves(game.current_player)):
+        record = game.make_move(*move)
+        counts[move] = perft(game, depth - 1)
+        game.unmake_move(record)
+    return counts
+
+
+def main() -> None:
+    """
+    Command line entry point; exits with status 1 if any count is wrong
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--depth', type=int, default=DEFAULT_DEPTH,
+                        help='deepest depth to count')
+    positions = parser.add_mutually_exclusive_group()
+    positions.add_argument('--position', choices=list(POSITIONS),
+                           help='count only this position')
+    positions.add_argument('--fen', help='count this position instead, '
+                                         'whose counts are not known')
+    parser.add_argument('--divide', action='store_true',
+                        help='print the count under each move at the '
+                             'deepest depth')
+    args = parser.parse_args()
+
+    if args.fen:
+        positions = {'fen': (args.fen, ())}
+    elif args.position:
+        positions = {args.position: POSITIONS[args.position]}
+    else:
+        positions = POSITIONS
+    failed = False
+    total_nodes = 0
+    total_seconds = 0.0
+    for name, (fen, expected) in positions.items():
+        game = Game.from_fen(fen)
+        print(name)
+        for depth in range(1, args.depth + 1):
+            start = time.perf_counter()
+            nodes = perft(game, depth)
+            seconds = time.perf_counter() - start
+            total_nodes += nodes
+            total_seconds += seconds
+            if depth <= len(expected):
+                ok = nodes == expected[depth - 1]
+                failed = failed or not ok
+                status = 'ok' if ok else f'expected {expected[depth - 1]:,}'
+            else:
+                status = 'unknown'
+            print(f'  depth {depth}  {nodes:>12,} nodes  {seconds:>8.3f} s  '
+                  f'{nodes / max(seconds, 1e-9):>12,.0f} nodes/s  {status}')
+        if args.divide:
+            for move, nodes in sorted(divide(game, args.depth).items(),
+                                      key=lambda item: move_name(item[0])):
+                print(f'    {move_name(move)}: {nodes:,}')
+    print(f'total  {total_nodes:,} nodes  {total_seconds:.3f} s  '
+          f'{total_nodes / max(total_seconds, 1e-9):,.0f} nodes/s')
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
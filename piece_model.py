@@ -4,7 +4,6 @@
 # - in association with Zachary Bauer
 from enum import Enum
 import abc
-import pygame
 
 
 class Color(Enum):
@@ -15,14 +14,63 @@ class Color(Enum):
     BLACK = 1
 
 
+# Ray directions as (y direction, x direction); y grows towards white's side
+NORTH, SOUTH, EAST, WEST, NORTH_EAST, NORTH_WEST, SOUTH_EAST, SOUTH_WEST = \
+    range(8)
+DIRECTIONS = ((-1, 0), (1, 0), (0, 1), (0, -1),
+              (-1, 1), (-1, -1), (1, 1), (1, -1))
+
+KNIGHT_OFFSETS = ((-2, -1), (-2, 1), (-1, -2), (-1, 2),
+                  (1, -2), (1, 2), (2, -1), (2, 1))
+KING_OFFSETS = ((-1, -1), (-1, 0), (-1, 1), (0, -1),
+                (0, 1), (1, -1), (1, 0), (1, 1))
+
+
+def _targets(y: int, x: int, offsets) -> list[tuple[int, int]]:
+    """
+    Gets the on-board squares at the given offsets from (y, x)
+    Parameters:
+        y (int): y coordinate of the square
+        x (int): x coordinate of the square
+        offsets (iterable): (y offset, x offset) pairs
+    Returns:
+        (list): squares that are on the board
+    """
+    return [(y + y_o, x + x_o) for y_o, x_o in offsets
+            if 0 <= y + y_o < 8 and 0 <= x + x_o < 8]
+
+
+def _ray(y: int, x: int, y_d: int, x_d: int) -> list[tuple[int, int]]:
+    """
+    Gets the squares from (y, x) to the edge of the board in one direction,
+    nearest first and not including (y, x) itself
+    """
+    return [(y + y_d * i, x + x_d * i) for i in range(1, 8)
+            if 0 <= y + y_d * i < 8 and 0 <= x + x_d * i < 8]
+
+
+# Move tables built once at import, indexed [y][x]. Pawn tables are
+# indexed by color value first; white pawns move towards y = 0
+KNIGHT_TARGETS = [[_targets(y, x, KNIGHT_OFFSETS) for x in range(8)]
+                  for y in range(8)]
+KING_TARGETS = [[_targets(y, x, KING_OFFSETS) for x in range(8)]
+                for y in range(8)]
+# Pushes are ordered one space then two spaces
+PAWN_PUSHES = [[[_ray(y, x, y_d, 0)[:2] for x in range(8)] for y in range(8)]
+               for y_d in (-1, 1)]
+PAWN_CAPTURES = [[[_targets(y, x, ((y_d, -1), (y_d, 1))) for x in range(8)]
+                  for y in range(8)] for y_d in (-1, 1)]
+# RAY_TARGETS[direction][y][x] is ordered outward from (y, x)
+RAY_TARGETS = [[[_ray(y, x, y_d, x_d) for x in range(8)] for y in range(8)]
+               for y_d, x_d in DIRECTIONS]
+
+
 class Piece(abc.ABC):
     """
     Abstract Method
-    Blueprint to make the chess pieces and give them valid moves and images
+    Blueprint to make the chess pieces and give them valid moves. Pieces
+    hold no images; the GUI draws them from a shared sprite cache
     """
-    # Static variable to hold images
-    image_path = 'images/pieces.png'
-    SPRITESHEET = pygame.image.load(image_path)
     # So pieces can keep track of the current game
     _game = None
 
@@ -41,8 +89,6 @@ class Piece(abc.ABC):
             color (Color): Color associated with the piece
         """
         self._color = color
-        # CHANGED THIS TO PYGAME.SRCALPHA
-        self._image = pygame.Surface((105, 105), pygame.SRCALPHA) # ???
 
     @property
     def color(self) -> Color:
@@ -53,126 +99,52 @@ class Piece(abc.ABC):
         """
         return self._color
 
-    def set_image(self, x: int, y: int) -> None:
-        """
-        Sets the image of a piece at an x, y coordinate
-        x (int): x coordinate
-        y (int): y coordinate
-        """
-        self._image.blit(Piece.SPRITESHEET, (0,0),
-                         pygame.rect.Rect(x, y, 105, 105))
-
-    def _diagonal_moves(self, y: int, x: int, y_d: int, x_d: int,
-                        distance: int) -> list[tuple[int, int]]:
-        """
-        Gets the possible moves for a piece that can move diagonally
-        Parameters:
-            y (int): current y coordinate of a piece
-            x (int): current x coordinate of a piece
-            y_d (int): direction you want to go with the y coordinate
-            x_d (int): direction you want to go with the x coordinate
-            distance (int): how many spaces the pieces can move
-        Returns:
-            possible_moves (list): possible moves for a piece
-        """
-        # Current location is (y, x)
-        possible_moves = []
-        piece = self._game._board[y][x]
-        color = piece.color
-        try:
-            # This will be used to check number of spaces from the current
-            # piece we can use
-            for i in range(1, distance + 1):
-                # Need to check the board at this index and see if it's None
-                # current index + (direction * number of spaces)
-                # If the space is None add it to the possible moves
-                if (y + y_d * i) >= 0 and (x + x_d * i) >= 0:
-                    if self._game._board[y + y_d * i][x + x_d * i] is None:
-                        possible_moves.append((y + (y_d * i), x + (x_d * i)))
-                    elif self._game._board[y + y_d * i][x + x_d * i].color is not color:
-                        possible_moves.append((y + (y_d * i), x + (x_d * i)))
-                        return possible_moves
-                    else:
-                        return possible_moves
-        except IndexError:
-            pass
-        return possible_moves
-
-    def _horizontal_moves(self, y: int, x: int, y_d: int, x_d: int,
-                        distance: int) -> list[tuple[int, int]]:
+    def _ray_moves(self, y: int, x: int, direction: int,
+                   distance: int) -> list[tuple[int, int]]:
         """
-        Gets the possible moves for a piece that can move horizontally
+        Gets the possible moves for a piece walking one precomputed ray
         Parameters:
             y (int): current y coordinate of a piece
             x (int): current x coordinate of a piece
-            y_d (int): direction you want to go with the y coordinate
-            x_d (int): direction you want to go with the x coordinate
+            direction (int): index into DIRECTIONS
             distance (int): how many spaces the pieces can move
         Returns:
             possible_moves (list): possible moves for a piece
         """
-        # Current location is (y,x)
         possible_moves = []
-        piece = self._game._board[y][x]
-        color = piece.color
-        try:
-            # This will be used to check number of spaces from the current
-            # piece we can use
-            for i in range(1, distance + 1):
-                # Need to check the board at this index and see if it's None
-                # current index + (direction * number of spaces)
-                # If the space is None add it to the possible moves
-                if (x + x_d * i) >= 0:
-                    if self._game._board[y][x + x_d * i] is None:
-                        possible_moves.append((y, x + (x_d * i)))
-                    elif self._game._board[y][x + x_d * i].color is not color:
-                        possible_moves.append((y, x + (x_d * i)))
-                        return possible_moves
-                    else:
-                        return possible_moves
-        except IndexError:
-            pass
+        board = self._game._board
+        color = self.color
+        # The ray already stops at the edge of the board; empty squares are
+        # moves, and the first piece ends the ray (a move if it can be taken)
+        for y2, x2 in RAY_TARGETS[direction][y][x][:distance]:
+            target = board[y2][x2]
+            if target is None:
+                possible_moves.append((y2, x2))
+            else:
+                if target.color is not color:
+                    possible_moves.append((y2, x2))
+                break
         return possible_moves
 
-    def _vertical_moves(self, y: int, x: int, y_d: int, x_d: int,
-                        distance: int) -> list[tuple[int, int]]:
+    def _step_moves(self, y: int, x: int,
+                    targets: list) -> list[tuple[int, int]]:
         """
-        Gets the possible moves for a piece that can move vertically
+        Gets the possible moves for a piece that jumps to fixed squares
         Parameters:
             y (int): current y coordinate of a piece
             x (int): current x coordinate of a piece
-            y_d (int): direction you want to go with the y coordinate
-            x_d (int): direction you want to go with the x coordinate
-            distance (int): how many spaces the pieces can move
+            targets (list): precomputed table of squares indexed [y][x]
         Returns:
-            possible_moves (list): possible moves for a piece
+            (list): squares that are empty or hold a piece of the other color
         """
-        # Current location is (y,x)
-        possible_moves = []
-        piece = self._game._board[y][x]
-        color = piece.color
-        try:
-            # This will be used to check number of spaces from the current
-            # piece we can use
-            for i in range(1, distance + 1):
-                # Need to check the board at this index and see if it's None
-                # current index + (direction * number of spaces)
-                # If the space is None add it to the list of possible moves
-                if (y + y_d * i) >= 0:
-                    if self._game._board[y + y_d * i][x] is None:
-                        possible_moves.append((y + (y_d * i), x))
-                    elif self._game._board[y + y_d * i][x].color is not color:
-                        possible_moves.append((y + (y_d * i), x))
-                        return possible_moves
-                    else:
-                        return possible_moves
-        except IndexError:
-            pass
-        return possible_moves
+        board = self._game._board
+        color = self.color
+        return [(y2, x2) for y2, x2 in targets[y][x]
+                if board[y2][x2] is None or board[y2][x2].color is not color]
 
     def get_diagonal_moves(self, y: int, x: int, distance: int) -> list[tuple[int, int]]:
         """
-        Calls diagonal functions to get all the diagonal directions spaces
+        Walks the diagonal rays to get all the diagonal directions spaces
         Parameters:
             y (int): current y coordinate of a piece
             x (int): current x coordinate of a piece
@@ -180,15 +152,14 @@ class Piece(abc.ABC):
         Returns:
             (list): of all the total moves
         """
-        moves1 = self._diagonal_moves(y, x, -1, -1, distance)
-        moves2 = self._diagonal_moves(y, x, -1, 1, distance)
-        moves3 = self._diagonal_moves(y, x, 1, -1, distance)
-        moves4 = self._diagonal_moves(y, x, 1, 1, distance)
-        return moves1 + moves2 + moves3 + moves4
+        return (self._ray_moves(y, x, NORTH_WEST, distance)
+                + self._ray_moves(y, x, NORTH_EAST, distance)
+                + self._ray_moves(y, x, SOUTH_WEST, distance)
+                + self._ray_moves(y, x, SOUTH_EAST, distance))
 
     def get_horizontal_moves(self, y: int, x: int, distance: int) -> list[tuple[int, int]]:
         """
-        Calls horizontal functions to get all the horizontal directions spaces
+        Walks the horizontal rays to get all the horizontal directions spaces
         Parameters:
             y (int): current y coordinate of a piece
             x (int): current x coordinate of a piece
@@ -196,13 +167,12 @@ class Piece(abc.ABC):
         Returns:
             (list): of all the total moves
         """
-        moves1 = self._horizontal_moves(y, x, 1, 1, distance)
-        moves2 = self._horizontal_moves(y, x, 1, -1, distance)
-        return moves1 + moves2
+        return (self._ray_moves(y, x, EAST, distance)
+                + self._ray_moves(y, x, WEST, distance))
 
     def get_vertical_moves(self, y: int, x: int, distance: int) -> list[tuple[int, int]]:
         """
-        Calls vertical functions to get all the vertical directions spaces
+        Walks the vertical rays to get all the vertical directions spaces
         Parameters:
             y (int): current y coordinate of a piece
             x (int): current x coordinate of a piece
@@ -210,9 +180,8 @@ class Piece(abc.ABC):
         Returns:
             (list): of all the total moves
         """
-        moves1 = self._vertical_moves(y, x, 1, 1, distance)
-        moves2 = self._vertical_moves(y, x, -1, 1, distance)
-        return moves1 + moves2
+        return (self._ray_moves(y, x, SOUTH, distance)
+                + self._ray_moves(y, x, NORTH, distance))
 
     @abc.abstractmethod
     def valid_moves(self, y: int, x: int) -> list[tuple[int, int]]:
@@ -235,19 +204,11 @@ class Piece(abc.ABC):
 
 
 class King(Piece):
-    def __init__(self, color: Color):
-        """
-        Creates an instance of a King
+    """
+    Creates an instance of a King
         Parameters:
             color (Color): The color of the king
-        """
-        super().__init__(color)
-        # Sets the image for black and white king
-        if self.color == Color.WHITE:
-            self.set_image(0,0)
-        else:
-            self.set_image(0, 104)
-
+    """
     def valid_moves(self, y: int, x: int) -> list[tuple[int, int]]:
         """
         Gets the valid moves for the king
@@ -257,12 +218,8 @@ class King(Piece):
         Returns:
             (list): of valid king moves
         """
-        # Gets the diagonal, horizontal and vertical moves
-        # Returns them all in one big valid moves list
-        diag_moves = self.get_diagonal_moves(y, x, 1)
-        horizontal_moves = self.get_horizontal_moves(y, x, 1)
-        vertical_moves = self.get_vertical_moves(y, x, 1)
-        return diag_moves + horizontal_moves + vertical_moves
+        # One space in every direction, from the precomputed king table
+        return self._step_moves(y, x, KING_TARGETS)
 
     def copy(self):
         """
@@ -280,14 +237,6 @@ class Queen(Piece):
         Parameters:
             color (Color): The color of the queen
     """
-    def __init__(self, color: Color):
-        super().__init__(color)
-        # Sets image for black and white queen
-        if self.color == color.WHITE:
-            self.set_image(104, 0)
-        else:
-            self.set_image(104, 104)
-
     def valid_moves(self, y: int, x: int) -> list[tuple[int, int]]:
         """
         Gets the valid moves for the queen
@@ -320,14 +269,6 @@ class Bishop(Piece):
         Parameters:
             color (Color): The color of the bishop
     """
-    def __init__(self, color: Color):
-        super().__init__(color)
-        # Sets the image for a black and white bishop
-        if self.color == color.WHITE:
-            self.set_image(210, 0)
-        else:
-            self.set_image(210, 104)
-
     def valid_moves(self, y: int, x: int) -> list[tuple[int, int]]:
         """
         Gets the valid moves for the queen
@@ -357,14 +298,6 @@ class Rook(Piece):
         Parameters:
             color (Color): The color of the rook
     """
-    def __init__(self, color: Color):
-        super().__init__(color)
-        # Sets the image for a black and white rook
-        if self.color == color.WHITE:
-            self.set_image(420, 0)
-        else:
-            self.set_image(420, 104)
-
     def valid_moves(self, y: int, x: int) -> list[tuple[int, int]]:
         """
         Gets the valid moves for the queen
@@ -395,14 +328,6 @@ class Knight(Piece):
         Parameters:
             color (Color): The color of the rook
     """
-    def __init__(self, color: Color):
-        super().__init__(color)
-        # Sets the image for a black and white knight
-        if self.color == color.WHITE:
-            self.set_image(312, 0)
-        else:
-            self.set_image(312, 104)
-
     def valid_moves(self, y: int, x: int) -> list[tuple[int, int]]:
         """
         Gets the valid moves for the knight
@@ -412,31 +337,8 @@ class Knight(Piece):
         Returns:
             (list): of valid knight moves
         """
-        valid_moves = []
-        piece = self._game._board[y][x]
-        color = piece.color
-        # This is checking the spaces that are either two up/down
-        # or two left/right from the current space
-        for i in range(-2, 3, 4):
-            # This is checking the spaces that are either one up/down
-            # or one left/right from the current space
-            for j in range(-1, 2, 2):
-                # If this space on the board is not occupied it is a valid move
-                # It is also a valid move if it is a piece of the opposite color
-                if (0 <= (y + i) < 8) and (0 <= (x + j) < 8) and\
-                        self._game._board[y + i][x + j] is None:
-                    valid_moves.append((y + i, x + j))
-                elif (0 <= (y + i) < 8) and (0 <= (x + j) < 8) and\
-                    self._game._board[y + i][x + j].color is not color:
-                    valid_moves.append((y + i, x + j))
-
-                if (0 <= (x + i) < 8) and (0 <= (y + j) < 8) and\
-                        self._game._board[y + j][x + i] is None:
-                    valid_moves.append((y + j, x + i))
-                elif (0 <= (x + i) < 8) and (0 <= (y + j) < 8) and\
-                    self._game._board[y + j][x + i].color is not color:
-                    valid_moves.append((y + j, x + i))
-        return valid_moves
+        # The eight L-shaped jumps, from the precomputed knight table
+        return self._step_moves(y, x, KNIGHT_TARGETS)
 
     def copy(self):
         """
@@ -456,11 +358,6 @@ class Pawn(Piece):
     """
     def __init__(self, color: Color):
         super().__init__(color)
-        # Sets image for a black and white pawn
-        if self.color == color.WHITE:
-            self.set_image(530,0)
-        else:
-            self.set_image(530, 104)
         self.moved = False
 
     def valid_moves(self, y: int, x: int) -> list[tuple[int, int]]:
@@ -473,83 +370,20 @@ class Pawn(Piece):
             (list): of valid pawn moves
         """
         valid_moves = []
-        piece = self._game._board[y][x]
-        color = piece.color
-        # This works for the first move for the pawns
-        # Black pawns can move down the board and twice on their first move
-        if not self.moved and self.color == Color.BLACK:
-            for i in range(1, 3):
-                try:
-                    # If the space in front of them is occupied
-                    if self._game._board[y+i][x] is not None:
-                        break
-                    else:
-                        valid_moves.append((y + i, x))
-                except IndexError:
-                    pass
-
-            for j in range(-1, 2, 2):
-                try:
-                    if self._game._board[y+1][x+j] is not None and (x+j) != -1:
-                        # If the space diagonal to them is a piece of the opposite color
-                        if self._game._board[y+1][x+j].color is not color:
-                            valid_moves.append((y+1, x+j))
-                except IndexError:
-                    pass
-
-        # White pawns can move up the board and twice on their first move
-        elif not self.moved and self.color == Color.WHITE:
-            for i in range(1, 3):
-                try:
-                    # If the space in front of them is occupied
-                    if self._game._board[y - i][x] is not None:
-                        break
-                    else:
-                        valid_moves.append((y - i, x))
-                except IndexError:
-                    pass
-
-            for j in range(-1, 2, 2):
-                try:
-                    if self._game._board[y-1][x+j] is not None:
-                        # If the space diagonal to them is a piece of the opposite color
-                        if self._game._board[y-1][x+j].color is not color:
-                            valid_moves.append((y-1, x+j))
-                except IndexError:
-                    pass
-
-        # If the pawn has already moved once then it can only move one space up
-        elif self.moved and self.color == Color.BLACK:
-            for j in range(-1, 2, 2):
-                try:
-                    if self._game._board[y+1][x+j] is not None and (x+j) != -1:
-                        # If the space diagonal to them is a piece of the opposite color
-                        if self._game._board[y+1][x+j].color is not color:
-                            valid_moves.append((y+1, x+j))
-                except IndexError:
-                    pass
-            try:
-                # If the space in front of them is not occupied
-                if self._game._board[y+1][x] is None:
-                    valid_moves.append((y+1, x))
-            except IndexError:
-                pass
-
-        elif self.moved and self.color == Color.WHITE:
-            for j in range(-1, 2, 2):
-                try:
-                    if self._game._board[y-1][x+j] is not None:
-                        # If the space diagonal to them is a piece of the opposite color
-                        if self._game._board[y-1][x+j].color is not color:
-                            valid_moves.append((y-1, x+j))
-                except IndexError:
-                    pass
-            try:
-                # If the space in front of them is not occupied
-                if self._game._board[y-1][x] is None:
-                    valid_moves.append((y-1, x))
-            except IndexError:
-                pass
+        board = self._game._board
+        color = self.color
+        # Pawns can move forward one space, or two on their first move, as
+        # long as nothing is in the way
+        pushes = PAWN_PUSHES[color.value][y][x]
+        for y2, x2 in (pushes if not self.moved else pushes[:1]):
+            if board[y2][x2] is not None:
+                break
+            valid_moves.append((y2, x2))
+
+        # If the space diagonal to them is a piece of the opposite color
+        for y2, x2 in PAWN_CAPTURES[color.value][y][x]:
+            if board[y2][x2] is not None and board[y2][x2].color is not color:
+                valid_moves.append((y2, x2))
         return valid_moves
 
     def copy(self):
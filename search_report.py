@@ -0,0 +1,86 @@
+# Final Project - Chess - CIS 163
+# Prof. Ira Woodring
+# Created by Clay Beal
+# - in association with Zachary Bauer
+"""
+Reports the nodes a fixed depth search visits with each selective search
+technique turned on and off, over a few opening, middlegame and endgame
+positions.
+
+Usage:
+    python search_report.py [--depth N]
+"""
+import argparse
+import time
+
+from game import Game, START_FEN
+from engine import Engine, SearchFeatures, NO_FEATURES
+from transposition import TranspositionTable
+
+# Positions in FEN
+POSITIONS = {
+    'start': START_FEN,
+    'open game': 'r1bqkb1r/pppp1ppp/2n2n2/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R '
+                 'w - - 0 4',
+    'queen pawn': 'rnbqk2r/ppp1bppp/4pn2/3p2B1/2PP4/2N5/PP2PPPP/R2QKBNR '
+                  'w - - 0 5',
+    'middlegame': 'rnbqk2r/1p2bppp/p2p1n2/4p3/4P3/1NN5/PPP1BPPP/R1BQK2R '
+                  'w - - 0 8',
+    # Kings and pawns only, where null-move pruning must stay off since
+    # passing is often the best move
+    'pawn ending': '8/5p2/1p1k2p1/3p4/3P3P/1PK3P1/8/8 w - - 0 40',
+    'minor pieces': '8/2k2p2/2n1p1p1/4P3/1p1B1P2/1P2K3/8/8 w - - 0 36',
+}
+
+
+def count_nodes(fen: str, depth: int, features: SearchFeatures) -> tuple:
+    """
+    Searches a position to a fixed depth with a fresh transposition table
+    Parameters:
+        fen (str): the position in FEN
+        depth (int): plies to search
+        features (SearchFeatures): selective techniques to use
+    Returns:
+        (tuple): nodes visited, including quiescence nodes, the best move
+                 and its score
+    """
+    game = Game.from_fen(fen)
+    engine = Engine(game, table=TranspositionTable(4), features=features)
+    move, score = engine.search(depth)
+    return engine.nodes + engine.qnodes, move, score
+
+
+def main() -> None:
+    """
+    Command line entry point
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--depth', type=int, default=4)
+    args = parser.parse_args()
+
+    # Plain alpha-beta, each technique alone, everything but each
+    # technique, and everything
+    settings = [('none', NO_FEATURES)]
+    for name in SearchFeatures._fields:
+        settings.append((f'only {name}',
+                         NO_FEATURES._replace(**{name: True})))
+    for name in SearchFeatures._fields:
+        settings.append((f'all but {name}',
+                         SearchFeatures()._replace(**{name: False})))
+    settings.append(('all', SearchFeatures()))
+
+    names = list(POSITIONS)
+    print(f'{"depth " + str(args.depth):<28}' +
+          ''.join(f'{name:>14}' for name in names) + f'{"total":>10}'
+          f'{"seconds":>9}')
+    for label, features in settings:
+        start = time.perf_counter()
+        counts = [count_nodes(POSITIONS[name], args.depth, features)[0]
+                  for name in names]
+        seconds = time.perf_counter() - start
+        print(f'{label:<28}' + ''.join(f'{count:>14,}' for count in counts) +
+              f'{sum(counts):>10,}{seconds:>9.2f}')
+
+
+if __name__ == '__main__':
+    main()
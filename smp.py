@@ -0,0 +1,361 @@
+# Final Project - Chess - CIS 163
+# Prof. Ira Woodring
+# Created by Clay Beal
+# - in association with Zachary Bauer
+import multiprocessing
+import queue
+import time
+import weakref
+from multiprocessing import shared_memory
+from typing import Callable, NamedTuple, Optional
+
+from engine import Engine
+from eval_cache import EvaluationCache
+from transposition import TTEntry, DEFAULT_SIZE_MB
+
+# Layout of the data word of a shared table slot, low bits first:
+#   depth (8 bits), bound (2 bits), score + SCORE_OFFSET (22 bits),
+#   move code (13 bits, 0 for no move), age (8 bits) and a bit that is
+#   always set so an empty slot never matches
+SCORE_OFFSET = 1 << 21
+VALID_BIT = 1 << 63
+# How often the parent checks for dead workers while waiting for results
+RESULT_POLL_SECONDS = 0.1
+
+
+def _pack(depth: int, bound: int, score: int, move: Optional[tuple],
+          age: int) -> int:
+    """
+    Packs a search result into one 64-bit word
+    """
+    code = 0
+    if move is not None:
+        y, x, y2, x2 = move
+        code = 1 + (y * 8 + x) * 64 + y2 * 8 + x2
+    return VALID_BIT | depth | bound << 8 | (score + SCORE_OFFSET) << 10 | \
+        code << 32 | (age & 0xFF) << 48
+
+
+def _unpack(key: int, data: int) -> TTEntry:
+    """
+    Unpacks a word made by _pack
+    """
+    code = (data >> 32) & 0x1FFF
+    move = None
+    if code:
+        code -= 1
+        sq, sq2 = divmod(code, 64)
+        move = (sq // 8, sq % 8, sq2 // 8, sq2 % 8)
+    return TTEntry(key, data & 0xFF, (data >> 8) & 0x3,
+                   ((data >> 10) & 0x3FFFFF) - SCORE_OFFSET, move,
+                   (data >> 48) & 0xFF)
+
+
+def _release(words: memoryview, memory: shared_memory.SharedMemory,
+             owner: bool) -> None:
+    """
+    Lets go of a shared table's memory, freeing it if this process made it
+    """
+    words.release()
+    memory.close()
+    if owner:
+        memory.unlink()
+
+
+class SharedTranspositionTable:
+    """
+    Transposition table in shared memory that several processes read and
+    write without locks. Each slot is two 64-bit words: the packed result,
+    and the position's key XORed with it. A slot that another process was
+    halfway through writing no longer XORs back to the key, so a torn entry
+    reads as a miss instead of as another position's result. Replacement
+    works like TranspositionTable. Pickling a table attaches to the same
+    memory in the other process
+    Attributes:
+        size (int): number of slots, a power of two
+        size_mb (float): memory cap the table was made with
+        name (str): name of the shared memory block
+        stores (int): results written by this process
+        hits (int): probes by this process that found their position
+        probes (int): probes made by this process
+    """
+    SLOT_BYTES = 16
+
+    def __init__(self, size_mb: float = DEFAULT_SIZE_MB,
+                 name: Optional[str] = None) -> None:
+        """
+        Creates a table, or attaches to one made by another process
+        Parameters:
+            size_mb (float): memory cap in megabytes; the table gets the
+                             largest power of two slots that fits
+            name (str): name of the table to attach to, or None to make a
+                        new one
+        """
+        slots = max(1, int(size_mb * 1024 * 1024) // self.SLOT_BYTES)
+        self.size = 1 << (slots.bit_length() - 1)
+        self.size_mb = size_mb
+        self._mask = self.size - 1
+        owner = name is None
+        if owner:
+            self._memory = shared_memory.SharedMemory(
+                create=True, size=self.size * self.SLOT_BYTES)
+            self._memory.buf[:self.size * self.SLOT_BYTES] = \
+                bytes(self.size * self.SLOT_BYTES)
+        else:
+            self._memory = shared_memory.SharedMemory(name=name)
+        self.name = self._memory.name
+        self._words = self._memory.buf[:self.size * self.SLOT_BYTES].cast('Q')
+        self._finalizer = weakref.finalize(self, _release, self._words,
+                                           self._memory, owner)
+        self._age = 0
+        self.stores = 0
+        self.hits = 0
+        self.probes = 0
+
+    def __reduce__(self) -> tuple:
+        """
+        Pickles the table as the name of its memory
+        """
+        return SharedTranspositionTable, (self.size_mb, self.name)
+
+    def close(self) -> None:
+        """
+        Detaches from the memory, freeing it if this process made it
+        """
+        self._finalizer()
+
+    def new_search(self) -> None:
+        """
+        Marks the start of a new search so older entries are replaced first
+        """
+        self._age += 1
+
+    @property
+    def age(self) -> int:
+        """
+        Getter for the age of the current search
+        Returns:
+            (int): searches started since the table was created or cleared
+        """
+        return self._age
+
+    def set_age(self, age: int) -> None:
+        """
+        Sets the search age, so processes searching together agree on it
+        Parameters:
+            age (int): age of the current search
+        """
+        self._age = age
+
+    def clear(self) -> None:
+        """
+        Empties the table
+        """
+        self._memory.buf[:self.size * self.SLOT_BYTES] = \
+            bytes(self.size * self.SLOT_BYTES)
+        self._age = 0
+
+    def probe(self, key: int) -> Optional[TTEntry]:
+        """
+        Looks up a position
+        Parameters:
+            key (int): Zobrist key of the position
+        Returns:
+            (TTEntry): stored result, or None if the position is not stored
+        """
+        self.probes += 1
+        index = (key & self._mask) * 2
+        data = self._words[index + 1]
+        if data and self._words[index] ^ data == key:
+            self.hits += 1
+            return _unpack(key, data)
+        return None
+
+    def store(self, key: int, depth: int, bound: int, score: int,
+              move: Optional[tuple]) -> None:
+        """
+        Stores a search result, following the replacement policy
+        Parameters:
+            key (int): Zobrist key of the position
+            depth (int): plies the position was searched to
+            bound (int): EXACT, LOWER or UPPER
+            score (int): score of the position for the player to move
+            move (tuple): best move found, or None
+        """
+        index = (key & self._mask) * 2
+        words = self._words
+        old_data = words[index + 1]
+        if old_data:
+            old = _unpack(words[index] ^ old_data, old_data)
+            same = old.key == key
+            if not same and old.age == self._age & 0xFF and depth < old.depth:
+                return
+            # Keeps the old best move if the new result did not find one
+            if move is None and same:
+                move = old.move
+        data = _pack(max(depth, 0), bound, score, move, self._age)
+        words[index] = key ^ data
+        words[index + 1] = data
+        self.stores += 1
+
+    def hashfull(self) -> int:
+        """
+        Gets how full the table is, sampled over the first 1000 slots
+        Returns:
+            (int): per mille of sampled slots used in the current search
+        """
+        sample = min(1000, self.size)
+        age = self._age & 0xFF
+        used = sum(1 for i in range(sample)
+                   if self._words[i * 2 + 1] and
+                   (self._words[i * 2 + 1] >> 48) & 0xFF == age)
+        return used * 1000 // sample
+
+
+class ParallelResult(NamedTuple):
+    """
+    Result of a parallel search
+    Attributes:
+        move (tuple): best move as (y, x, y2, x2), or None if there is no
+                      legal move
+        score (int): its score for the player to move
+        depth (int): depth of the search the result comes from
+        nodes (int): positions visited by all the workers together
+    """
+    move: Optional[tuple]
+    score: int
+    depth: int
+    nodes: int
+
+
+def _time_left(deadline: Optional[float]) -> Optional[int]:
+    """
+    Gets the milliseconds left until a wall-clock deadline, which unlike a
+    budget means the same thing in every process
+    """
+    if deadline is None:
+        return None
+    return max(0, int((deadline - time.time()) * 1000))
+
+
+def _worker(game, evaluate: Optional[Callable], table_name: str,
+            table_mb: float, age: int, index: int, depth: int,
+            deadline: Optional[float], max_nodes: Optional[int],
+            results) -> None:
+    """
+    Searches the root in a worker process and puts the result on a queue.
+    Odd workers start one ply deeper, so the workers spread over
+    neighbouring depths instead of repeating each other's work, and fill
+    the shared table for each other. The time budget runs to the deadline
+    set by the parent, so the time it took to start the worker counts
+    against it. A search that fails puts its error on the queue instead,
+    so the parent never waits for a result that will not come
+    """
+    # Attaches by name, since a forked worker would otherwise inherit the
+    # parent's table object and free the memory when closing it
+    table = SharedTranspositionTable(table_mb, table_name)
+    try:
+        # The search moves the table on to the next age itself
+        table.set_age(age - 1)
+        cache = EvaluationCache() if evaluate is None else None
+        engine = Engine(game, evaluate, table, cache)
+        move, score = engine.search(depth, _time_left(deadline), max_nodes,
+                                    start_depth=1 + index % 2)
+        results.put((index, move, score, engine.depth_reached,
+                     engine.nodes + engine.qnodes, None))
+    except Exception as error:
+        results.put((index, None, 0, 0, 0, repr(error)))
+    finally:
+        table.close()
+
+
+def _collect(processes: list, results) -> list:
+    """
+    Waits for a result from every worker, giving up on workers that died
+    without putting one, such as ones killed for running out of memory
+    Returns:
+        (list): results of the workers whose search completed
+    """
+    found = []
+    waiting = set(range(len(processes)))
+    while waiting:
+        try:
+            result = results.get(timeout=RESULT_POLL_SECONDS)
+        except queue.Empty:
+            # A worker that exited cleanly put its result before exiting
+            waiting -= {index for index in waiting
+                        if processes[index].exitcode not in (None, 0)}
+            continue
+        waiting.discard(result[0])
+        if result[5] is None:
+            found.append(result)
+    return found
+
+
+def parallel_search(game, workers: int, depth: int,
+                    time_ms: Optional[int] = None,
+                    max_nodes: Optional[int] = None,
+                    table: Optional[SharedTranspositionTable] = None,
+                    evaluate: Optional[Callable] = None) -> ParallelResult:
+    """
+    Searches the position of the player to move with several processes at
+    once (lazy SMP). Every worker searches the whole tree on its own copy of
+    the game, sharing results through one lock-free transposition table, and
+    the result of the deepest completed search wins. If every worker fails,
+    the position is searched again in this process with the time that is
+    left, which raises the error if it came from the search itself
+    Parameters:
+        game (Game): game to search; it is not changed
+        workers (int): number of worker processes
+        depth (int): deepest number of plies to look ahead
+        time_ms (int): wall-clock budget in milliseconds, no limit if not
+                       given
+        max_nodes (int): node budget of each worker, no limit if not given
+        table (SharedTranspositionTable): table to share; a new default
+                                          sized one, freed afterwards, if
+                                          not given
+        evaluate (callable): evaluation function for the engines, the
+                             default if not given; it is pickled, so it
+                             must be a module level function. Evaluations
+                             that read the game's accumulator work, as each
+                             worker's copy of the game gets its own
+    Returns:
+        (ParallelResult): best move, score, depth and total nodes
+    """
+    deadline = None
+    if time_ms is not None:
+        deadline = time.time() + time_ms / 1000
+    own_table = table is None
+    if own_table:
+        table = SharedTranspositionTable()
+    table.new_search()
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(
+        target=_worker, daemon=True,
+        args=(game.copy(), evaluate, table.name, table.size_mb, table.age,
+              index, depth, deadline, max_nodes, results))
+        for index in range(workers)]
+    try:
+        for process in processes:
+            process.start()
+        found = _collect(processes, results)
+        for process in processes:
+            process.join()
+        if not found:
+            cache = EvaluationCache() if evaluate is None else None
+            engine = Engine(game.copy(), evaluate, table, cache)
+            move, score = engine.search(depth, _time_left(deadline),
+                                        max_nodes)
+            return ParallelResult(move, score, engine.depth_reached,
+                                  engine.nodes + engine.qnodes)
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        if own_table:
+            table.close()
+    # Deepest completed search first, the first worker breaking ties
+    index, move, score, reached, _, _ = max(
+        found, key=lambda result: (result[3], -result[0]))
+    return ParallelResult(move, score, reached,
+                          sum(result[4] for result in found))
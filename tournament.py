@@ -0,0 +1,419 @@
+# Final Project - Chess - CIS 163
+# Prof. Ira Woodring
+# Created by Clay Beal
+# - in association with Zachary Bauer
+"""
+Plays headless engine-vs-engine matches over a process pool and reports
+the result as W/D/L, an Elo difference with error bars, and a sequential
+probability ratio test (SPRT) that stops the match once it is decided.
+
+Games are played in pairs from each opening with colors swapped. Every
+finished game is appended to a JSONL file, so a stopped match started again
+with the same output file picks up where it left off; a game cut off halfway
+through being written is dropped and played again. Once the SPRT decides,
+the games still being played are abandoned.
+
+An engine is described by comma separated settings:
+    name=NAME         name in the results (required)
+    depth=N           deepest search depth (default 64)
+    time=MS           time per move in milliseconds
+    nodes=N           node budget per move
+    eval=MOD:FUNC     evaluation function (default full_evaluation, or
+                      nnue_evaluation when weights are given)
+    weights=PATH      network weights (.npz, see nnue.py) for an
+                      evaluation that reads the game's accumulator
+    off=A+B           selective search features to turn off, like
+                      null_move+pvs
+
+Usage:
+    python tournament.py 'name=new,nodes=20000' \\
+        'name=old,nodes=20000,off=null_move' [--games N] [--workers N]
+        [--output FILE] [--max-moves N] [--elo0 E] [--elo1 E]
+"""
+import argparse
+import importlib
+import json
+import math
+import multiprocessing
+import os
+import sys
+from typing import NamedTuple, Optional
+
+from piece_model import Color
+from game import Game, move_name
+from engine import Engine, SearchFeatures, MAX_DEPTH
+from eval_cache import EvaluationCache
+from transposition import TranspositionTable
+
+# Positions in FEN after short opening lines; each is played once with
+# each color
+OPENINGS = (
+    'rnbqkbnr/pppp1ppp/8/4p3/4P3/8/PPPP1PPP/RNBQKBNR w - - 0 2',
+    'rnbqkbnr/pp1ppppp/8/2p5/4P3/8/PPPP1PPP/RNBQKBNR w - - 0 2',
+    'rnbqkbnr/pppp1ppp/4p3/8/4P3/8/PPPP1PPP/RNBQKBNR w - - 0 2',
+    'rnbqkbnr/pp1ppppp/2p5/8/4P3/8/PPPP1PPP/RNBQKBNR w - - 0 2',
+    'rnbqkbnr/ppp1pppp/8/3p4/3P4/8/PPP1PPPP/RNBQKBNR w - - 0 2',
+    'rnbqkb1r/pppppppp/5n2/8/3P4/8/PPP1PPPP/RNBQKBNR w - - 0 2',
+    'rnbqkbnr/pppp1ppp/8/4p3/2P5/8/PP1PPPPP/RNBQKBNR w - - 0 2',
+    'rnbqkbnr/ppp1pppp/8/3p4/8/5N2/PPPPPPPP/RNBQKB1R w - - 0 2',
+    'r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w - - 0 3',
+    'rnbqkbnr/ppp2ppp/4p3/3p4/2PP4/8/PP2PPPP/RNBQKBNR w - - 0 3',
+    'rnb1kbnr/ppp1pppp/8/3q4/8/8/PPPP1PPP/RNBQKBNR w - - 0 3',
+    'rnbqkb1r/pppppp1p/5np1/8/2PP4/8/PP2PPPP/RNBQKBNR w - - 0 3',
+)
+DEFAULT_GAMES = 200
+DEFAULT_MAX_MOVES = 150
+# Transposition table size of each engine, small as many games run at once
+TABLE_MB = 4
+# Evaluation that reads the accumulator built from an engine's weights
+NNUE_EVALUATION = 'nnue:nnue_evaluation'
+
+
+class EngineConfig(NamedTuple):
+    """
+    Settings of one side of a match
+    Attributes:
+        name (str): name in the results
+        depth (int): deepest search depth
+        time_ms (int): time per move in milliseconds, or None
+        max_nodes (int): node budget per move, or None
+        evaluate (str): evaluation function as MODULE:FUNCTION, or None for
+                        the default
+        off (tuple): names of SearchFeatures turned off
+        weights (str): path of the network weights an accumulator is built
+                       from, or None to search without one
+    """
+    name: str
+    depth: int = MAX_DEPTH
+    time_ms: Optional[int] = None
+    max_nodes: Optional[int] = None
+    evaluate: Optional[str] = None
+    off: tuple = ()
+    weights: Optional[str] = None
+
+
+def parse_engine(spec: str) -> EngineConfig:
+    """
+    Reads an engine description like 'name=new,depth=4,off=null_move'
+    Parameters:
+        spec (str): comma separated key=value settings
+    Returns:
+        (EngineConfig): the settings
+    """
+    settings = dict(item.split('=', 1) for item in spec.split(',') if item)
+    unknown = set(settings) - {'name', 'depth', 'time', 'nodes', 'eval', 'off',
+                               'weights'}
+    if unknown or 'name' not in settings:
+        raise ValueError(f'bad engine description {spec!r}')
+    off = tuple(name for name in settings.get('off', '').split('+') if name)
+    for name in off:
+        if name not in SearchFeatures._fields:
+            raise ValueError(f'unknown search feature {name!r}')
+    if 'depth' not in settings and 'time' not in settings and \
+            'nodes' not in settings:
+        raise ValueError(f'{spec!r} needs a depth, time or nodes limit')
+    evaluate = settings.get('eval')
+    if 'weights' in settings:
+        evaluate = evaluate or NNUE_EVALUATION
+    elif evaluate == NNUE_EVALUATION:
+        raise ValueError(f'{spec!r} needs weights for {NNUE_EVALUATION}')
+    return EngineConfig(settings['name'],
+                        int(settings.get('depth', MAX_DEPTH)),
+                        int(settings['time']) if 'time' in settings else None,
+                        int(settings['nodes']) if 'nodes' in settings
+                        else None, evaluate, off, settings.get('weights'))
+
+
+class _Player:
+    """
+    One engine playing one game, keeping its tables between its moves
+    """
+    def __init__(self, config: EngineConfig) -> None:
+        """
+        Creates a player
+        Parameters:
+            config (EngineConfig): engine settings
+        """
+        self.config = config
+        self.evaluate = None
+        if config.evaluate is not None:
+            module, _, function = config.evaluate.partition(':')
+            self.evaluate = getattr(importlib.import_module(module), function)
+        self.features = SearchFeatures()._replace(
+            **{name: False for name in config.off})
+        self.network = None
+        if config.weights is not None:
+            # NumPy is only needed by engines with a network
+            from nnue import Network
+            self.network = Network.load(config.weights)
+        self.table = TranspositionTable(TABLE_MB)
+        self.cache = EvaluationCache() if self.evaluate is None else None
+
+    def choose(self, game) -> tuple:
+        """
+        Searches for the move to play. A player with a network attaches
+        an accumulator built for the position for the length of the search,
+        so the two players never share one
+        Parameters:
+            game (Game): game to move in
+        Returns:
+            (tuple): move as (y, x, y2, x2)
+        """
+        if self.network is not None:
+            from nnue import Accumulator
+            game.attach_accumulator(Accumulator(self.network, game._board))
+        try:
+            engine = Engine(game, self.evaluate, self.table, self.cache,
+                            self.features)
+            move, _ = engine.search(self.config.depth, self.config.time_ms,
+                                    self.config.max_nodes)
+        finally:
+            game.attach_accumulator(None)
+        return move
+
+
+def play_game(index: int, white: EngineConfig, black: EngineConfig,
+              opening: str, max_moves: int) -> dict:
+    """
+    Plays one game to mate, stalemate or the move limit
+    Parameters:
+        index (int): game number
+        white (EngineConfig): engine playing white
+        black (EngineConfig): engine playing black
+        opening (str): position in FEN the engines start from
+        max_moves (int): moves by each side after which the game is drawn
+    Returns:
+        (dict): game number, names, result ('1-0', '0-1' or '1/2-1/2'), how
+                it ended, and the moves played
+    """
+    game = Game.from_fen(opening)
+    players = {Color.WHITE: _Player(white), Color.BLACK: _Player(black)}
+    moves = []
+    while True:
+        color = game.current_player
+        if not list(game.legal_moves(color)):
+            if game.check(color):
+                result = '0-1' if color == Color.WHITE else '1-0'
+                reason = 'mate'
+            else:
+                result, reason = '1/2-1/2', 'stalemate'
+            break
+        if len(moves) >= max_moves * 2:
+            result, reason = '1/2-1/2', 'move limit'
+            break
+        move = players[color].choose(game)
+        game.make_move(*move)
+        moves.append(move_name(move))
+    return {'type': 'game', 'index': index, 'white': white.name,
+            'black': black.name, 'opening': opening, 'result': result,
+            'reason': reason, 'moves': ' '.join(moves)}
+
+
+def _play(arguments: tuple) -> dict:
+    """
+    Plays one game in a pool worker from play_game's arguments
+    """
+    return play_game(*arguments)
+
+
+def tally(games: list, name: str) -> tuple[int, int, int]:
+    """
+    Counts the wins, draws and losses of one engine
+    Parameters:
+        games (list): game records from play_game
+        name (str): engine to count for
+    Returns:
+        (tuple): wins, draws, losses
+    """
+    wins = draws = losses = 0
+    for game in games:
+        if game['result'] == '1/2-1/2':
+            draws += 1
+        elif (game['result'] == '1-0') == (game['white'] == name):
+            wins += 1
+        else:
+            losses += 1
+    return wins, draws, losses
+
+
+def _score_variance(wins: int, draws: int, losses: int) -> tuple[float, float]:
+    """
+    Gets the mean score per game and its per-game variance
+    """
+    games = wins + draws + losses
+    score = (wins + draws / 2) / games
+    variance = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 +
+                losses * score ** 2) / games
+    return score, variance
+
+
+def _elo(score: float) -> float:
+    """
+    Converts an expected score to an Elo difference
+    """
+    score = min(max(score, 1e-6), 1 - 1e-6)
+    return -400 * math.log10(1 / score - 1)
+
+
+def elo_estimate(wins: int, draws: int, losses: int) -> tuple[float, float]:
+    """
+    Estimates the Elo difference from a match result
+    Parameters:
+        wins (int): games won
+        draws (int): games drawn
+        losses (int): games lost
+    Returns:
+        (tuple): Elo difference and half the width of its 95% confidence
+                 interval
+    """
+    games = wins + draws + losses
+    if games == 0:
+        return 0.0, math.inf
+    score, variance = _score_variance(wins, draws, losses)
+    if variance == 0:
+        return _elo(score), math.inf
+    margin = 1.96 * math.sqrt(variance / games)
+    low = _elo(score - margin)
+    high = _elo(score + margin)
+    return _elo(score), (high - low) / 2
+
+
+def sprt(wins: int, draws: int, losses: int, elo0: float, elo1: float,
+         alpha: float, beta: float) -> tuple[float, float, float]:
+    """
+    Runs a sequential probability ratio test of the hypotheses that the
+    Elo difference is elo0 against that it is elo1, using the normal
+    approximation of the log-likelihood ratio
+    Parameters:
+        wins (int): games won
+        draws (int): games drawn
+        losses (int): games lost
+        elo0 (float): Elo difference of the null hypothesis
+        elo1 (float): Elo difference of the alternative hypothesis
+        alpha (float): chance of accepting elo1 when elo0 is true
+        beta (float): chance of accepting elo0 when elo1 is true
+    Returns:
+        (tuple): log-likelihood ratio and the lower and upper bounds; below
+                 the lower bound accepts elo0, above the upper accepts elo1
+    """
+    lower = math.log(beta / (1 - alpha))
+    upper = math.log((1 - beta) / alpha)
+    games = wins + draws + losses
+    if games == 0:
+        return 0.0, lower, upper
+    score, variance = _score_variance(wins, draws, losses)
+    if variance == 0:
+        return 0.0, lower, upper
+    score0 = 1 / (1 + 10 ** (-elo0 / 400))
+    score1 = 1 / (1 + 10 ** (-elo1 / 400))
+    llr = games * (score1 - score0) * (2 * score - score0 - score1) / \
+        (2 * variance)
+    return llr, lower, upper
+
+
+def _load_results(path: str, settings: dict) -> list:
+    """
+    Reads the games already played from a results file, checking it was
+    written for the same match. A last line cut off by the match being
+    stopped halfway through writing it is cut from the file
+    """
+    games = []
+    if not os.path.exists(path):
+        return games
+    with open(path, 'rb+') as file:
+        lines = file.readlines()
+        if lines and not lines[-1].endswith(b'\n'):
+            file.truncate(file.tell() - len(lines[-1]))
+            lines.pop()
+        for line in lines:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if record['type'] == 'settings':
+                if record != settings:
+                    raise ValueError(f'{path} holds a different match')
+            else:
+                games.append(record)
+    return games
+
+
+def main() -> None:
+    """
+    Command line entry point
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('first', help='engine being tested')
+    parser.add_argument('second', help='engine it is tested against')
+    parser.add_argument('--games', type=int, default=DEFAULT_GAMES)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--output', default='tournament.jsonl')
+    parser.add_argument('--max-moves', type=int, default=DEFAULT_MAX_MOVES)
+    parser.add_argument('--elo0', type=float, default=0.0)
+    parser.add_argument('--elo1', type=float, default=10.0)
+    parser.add_argument('--alpha', type=float, default=0.05)
+    parser.add_argument('--beta', type=float, default=0.05)
+    args = parser.parse_args()
+
+    try:
+        first = parse_engine(args.first)
+        second = parse_engine(args.second)
+    except ValueError as error:
+        parser.error(str(error))
+    if first.name == second.name:
+        parser.error('the engines need different names')
+    settings = {'type': 'settings', 'first': first._asdict(),
+                'second': second._asdict(), 'max_moves': args.max_moves,
+                'elo0': args.elo0, 'elo1': args.elo1, 'alpha': args.alpha,
+                'beta': args.beta}
+    # Tuples come back from JSON as lists
+    settings = json.loads(json.dumps(settings))
+    games = _load_results(args.output, settings)
+    done = {game['index'] for game in games}
+
+    def report() -> bool:
+        wins, draws, losses = tally(games, first.name)
+        elo, margin = elo_estimate(wins, draws, losses)
+        llr, lower, upper = sprt(wins, draws, losses, args.elo0, args.elo1,
+                                 args.alpha, args.beta)
+        print(f'{len(games)} games  {first.name} +{wins} ={draws} -{losses}  '
+              f'Elo {elo:+.1f} +/- {margin:.1f}  '
+              f'LLR {llr:.2f} ({lower:.2f}, {upper:.2f})', flush=True)
+        if llr >= upper:
+            print(f'SPRT: H1 accepted, {first.name} is at least '
+                  f'{args.elo1:+g} Elo')
+        elif llr <= lower:
+            print(f'SPRT: H0 accepted, {first.name} is not {args.elo1:+g} '
+                  f'Elo better')
+        return not lower < llr < upper
+
+    decided = bool(games) and report()
+    if decided:
+        return
+    with open(args.output, 'a') as file:
+        if not os.path.getsize(args.output):
+            file.write(json.dumps(settings) + '\n')
+        games_left = []
+        for index in range(args.games):
+            if index in done:
+                continue
+            opening = OPENINGS[(index // 2) % len(OPENINGS)]
+            white, black = (first, second) if index % 2 == 0 \
+                else (second, first)
+            games_left.append((index, white, black, opening, args.max_moves))
+        with multiprocessing.Pool(args.workers) as pool:
+            for game in pool.imap_unordered(_play, games_left):
+                file.write(json.dumps(game) + '\n')
+                file.flush()
+                games.append(game)
+                decided = report()
+                if decided:
+                    # Stops the games in progress instead of playing them
+                    # out
+                    pool.terminate()
+                    break
+    if not decided:
+        print('game limit reached without an SPRT decision')
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,124 @@
+# Final Project - Chess - CIS 163
+# Prof. Ira Woodring
+# Created by Clay Beal
+# - in association with Zachary Bauer
+from typing import NamedTuple, Optional
+
+# Bound types: the stored score is exact, or only a lower bound (the search
+# failed high) or an upper bound (the search failed low)
+EXACT, LOWER, UPPER = range(3)
+
+DEFAULT_SIZE_MB = 16
+
+
+class TTEntry(NamedTuple):
+    """
+    One stored search result
+    Attributes:
+        key (int): full Zobrist key of the position
+        depth (int): plies the position was searched to
+        bound (int): EXACT, LOWER or UPPER
+        score (int): score of the position for the player to move
+        move (tuple): best move found as (y, x, y2, x2), or None
+        age (int): search the entry was stored in
+    """
+    key: int
+    depth: int
+    bound: int
+    score: int
+    move: Optional[tuple]
+    age: int
+
+
+class TranspositionTable:
+    """
+    Fixed-size table of search results indexed by the low bits of the
+    Zobrist key. Each slot holds one entry; a new result replaces the one in
+    its slot if the slot is empty, holds the same position, was stored in an
+    earlier search, or was searched less deeply than the new result
+    Attributes:
+        size (int): number of slots, a power of two
+        stores (int): results written since the table was created
+        hits (int): probes that found their position
+        probes (int): probes made
+    """
+    # Rough memory use of one filled slot: the list pointer, the entry
+    # tuple and its ints
+    ENTRY_BYTES = 160
+
+    def __init__(self, size_mb: float = DEFAULT_SIZE_MB) -> None:
+        """
+        Creates an empty table
+        Parameters:
+            size_mb (float): memory cap in megabytes; the table gets the
+                             largest power of two slots that fits
+        """
+        slots = max(1, int(size_mb * 1024 * 1024) // self.ENTRY_BYTES)
+        self.size = 1 << (slots.bit_length() - 1)
+        self._mask = self.size - 1
+        self._entries = [None] * self.size
+        self._age = 0
+        self.stores = 0
+        self.hits = 0
+        self.probes = 0
+
+    def new_search(self) -> None:
+        """
+        Marks the start of a new search so older entries are replaced first
+        """
+        self._age += 1
+
+    def clear(self) -> None:
+        """
+        Empties the table
+        """
+        self._entries = [None] * self.size
+        self._age = 0
+
+    def probe(self, key: int) -> Optional[TTEntry]:
+        """
+        Looks up a position
+        Parameters:
+            key (int): Zobrist key of the position
+        Returns:
+            (TTEntry): stored result, or None if the position is not stored
+        """
+        self.probes += 1
+        entry = self._entries[key & self._mask]
+        if entry is not None and entry.key == key:
+            self.hits += 1
+            return entry
+        return None
+
+    def store(self, key: int, depth: int, bound: int, score: int,
+              move: Optional[tuple]) -> None:
+        """
+        Stores a search result, following the replacement policy
+        Parameters:
+            key (int): Zobrist key of the position
+            depth (int): plies the position was searched to
+            bound (int): EXACT, LOWER or UPPER
+            score (int): score of the position for the player to move
+            move (tuple): best move found, or None
+        """
+        index = key & self._mask
+        old = self._entries[index]
+        if old is None or old.key == key or old.age != self._age \
+                or depth >= old.depth:
+            # Keeps the old best move if the new result did not find one
+            if move is None and old is not None and old.key == key:
+                move = old.move
+            self._entries[index] = TTEntry(key, depth, bound, score, move,
+                                           self._age)
+            self.stores += 1
+
+    def hashfull(self) -> int:
+        """
+        Gets how full the table is, sampled over the first 1000 slots
+        Returns:
+            (int): per mille of sampled slots used in the current search
+        """
+        sample = self._entries[:1000]
+        used = sum(1 for entry in sample
+                   if entry is not None and entry.age == self._age)
+        return used * 1000 // len(sample)
@@ -0,0 +1,75 @@
+# Final Project - Chess - CIS 163
+# Prof. Ira Woodring
+# Created by Clay Beal
+# - in association with Zachary Bauer
+import random
+
+from piece_model import Color, Pawn
+from bitboard import KIND_INDEX, PAWN
+
+# Zobrist keys: a position's key is the XOR of one random 64-bit number per
+# feature of the position, so a move updates it with a few XORs. The seed is
+# fixed so every process and every run gives a position the same key
+_random = random.Random(0x5EED)
+
+# PIECE_KEYS[color value][kind][square]
+PIECE_KEYS = [[[_random.getrandbits(64) for _ in range(64)] for _ in range(6)]
+              for _ in range(2)]
+# XORed in while black is the player to move
+BLACK_TO_MOVE_KEY = _random.getrandbits(64)
+# XORed in for every pawn that has not moved yet, since it can still move
+# two spaces
+UNMOVED_PAWN_KEYS = [_random.getrandbits(64) for _ in range(64)]
+
+
+def piece_key(piece, sq: int) -> int:
+    """
+    Gets the key for a piece standing on a square, including its moved
+    state if it is a pawn
+    Parameters:
+        piece (Piece): piece on the square
+        sq (int): square index
+    Returns:
+        (int): 64-bit key
+    """
+    key = PIECE_KEYS[piece.color.value][KIND_INDEX[type(piece)]][sq]
+    if type(piece) is Pawn and not piece.moved:
+        key ^= UNMOVED_PAWN_KEYS[sq]
+    return key
+
+
+def hash_position(board: list, player: Color) -> int:
+    """
+    Computes the key of a position from scratch
+    Parameters:
+        board (list): 2-d list of pieces
+        player (Color): player to move
+    Returns:
+        (int): 64-bit key
+    """
+    key = 0
+    for y in range(8):
+        for x in range(8):
+            if board[y][x] is not None:
+                key ^= piece_key(board[y][x], y * 8 + x)
+    if player == Color.BLACK:
+        key ^= BLACK_TO_MOVE_KEY
+    return key
+
+
+def pawn_hash(board: list) -> int:
+    """
+    Computes the pawn key of a position from scratch: the key of its pawns
+    alone, without their moved states, shared by every position with the
+    same pawn structure
+    Parameters:
+        board (list): 2-d list of pieces
+    Returns:
+        (int): 64-bit key
+    """
+    key = 0
+    for y in range(8):
+        for x in range(8):
+            if type(board[y][x]) is Pawn:
+                key ^= PIECE_KEYS[board[y][x].color.value][PAWN][y * 8 + x]
+    return key